@@ -16,6 +16,63 @@ def get_args():
         metavar="N",
         help="how many batches to wait before logging training status",
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="validate arguments and exit without connecting to ClearML or training",
+    )
+    parser.add_argument(
+        "--report-import-times",
+        action="store_true",
+        default=False,
+        help="print the time spent importing heavy modules at startup",
+    )
+
+    # cpu threads / affinity
+    parser.add_argument(
+        "--num-workers", type=int, default=None, metavar="N", help="data loader workers (default: automatic)"
+    )
+    parser.add_argument(
+        "--num-threads", type=int, default=None, metavar="N", help="intra-op compute threads (default: automatic)"
+    )
+    parser.add_argument(
+        "--num-interop-threads", type=int, default=None, metavar="N", help="inter-op threads (default: 1)"
+    )
+    parser.add_argument(
+        "--no-cpu-pinning",
+        action="store_true",
+        default=False,
+        help="do not pin the loader workers and compute threads to their cores",
+    )
+    parser.add_argument(
+        "--tune-cpu-layout",
+        action="store_true",
+        default=False,
+        help="benchmark loader / compute core splits on this machine and use the fastest",
+    )
+
+    # metrics
+    parser.add_argument(
+        "--metrics-backend",
+        type=str,
+        default="clearml",
+        choices=["clearml", "jsonl", "csv", "noop"],
+        help="where training metrics are reported (default: clearml)",
+    )
+    parser.add_argument(
+        "--metrics-path", type=str, default=None, help="output file for the jsonl / csv metrics backends"
+    )
+    parser.add_argument(
+        "--metrics-flush-interval",
+        type=float,
+        default=1.0,
+        metavar="SEC",
+        help="seconds between background flushes of buffered metrics (default: 1.0)",
+    )
+    parser.add_argument(
+        "--no-metrics-buffer", action="store_true", default=False, help="report every metric synchronously"
+    )
 
     # hyperparams
     parser.add_argument(
@@ -27,6 +84,187 @@ def get_args():
     parser.add_argument("--epochs", type=int, default=1, metavar="N", help="number of epochs to train (default: 1)")
     parser.add_argument("--learn-rate", type=float, default=0.01, metavar="LR", help="learning rate (default: 0.01)")
     parser.add_argument("--momentum", type=float, default=0.5, metavar="M", help="SGD momentum (default: 0.5)")
+    parser.add_argument(
+        "--optimizer",
+        type=str,
+        default="sgd",
+        choices=["sgd", "lars", "lamb"],
+        help="optimizer, lars / lamb for large effective batches (default: sgd)",
+    )
+    parser.add_argument("--weight-decay", type=float, default=0.0, metavar="WD", help="weight decay (default: 0)")
+    parser.add_argument(
+        "--accum-steps",
+        type=int,
+        default=1,
+        metavar="N",
+        help="batches to accumulate gradients over per optimizer step (default: 1)",
+    )
+    parser.add_argument(
+        "--lr-scaling",
+        type=str,
+        default="none",
+        choices=["none", "linear", "sqrt"],
+        help="scale the learning rate with the effective batch size (default: none)",
+    )
+    parser.add_argument(
+        "--base-batch-size",
+        type=int,
+        default=64,
+        metavar="N",
+        help="batch size the learning rate is given for when scaling it (default: 64)",
+    )
+    parser.add_argument(
+        "--warmup-epochs",
+        type=float,
+        default=0.0,
+        metavar="E",
+        help="epochs of linear learning rate warmup (default: 0)",
+    )
+
+    # early stopping / evaluation cadence
+    parser.add_argument(
+        "--target-accuracy",
+        type=float,
+        default=None,
+        metavar="ACC",
+        help="stop once the full test accuracy (0-1) reaches this value (default: disabled)",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=0,
+        metavar="N",
+        help="stop after N evaluations without improvement (default: 0, disabled)",
+    )
+    parser.add_argument(
+        "--min-delta", type=float, default=0.0, help="minimum accuracy increase counted as improvement (default: 0)"
+    )
+    parser.add_argument(
+        "--eval-subset-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="evaluate on a fixed N samples test subset, full test only on improvement (default: 0, disabled)",
+    )
+    parser.add_argument(
+        "--eval-interval",
+        type=int,
+        default=0,
+        metavar="N",
+        help="batches between two subset evaluations, 0 for end of epoch only (default: 0)",
+    )
+
+    # structured pruning
+    parser.add_argument(
+        "--prune-conv1-channels", type=int, default=None, metavar="N", help="conv1 channels kept after pruning"
+    )
+    parser.add_argument(
+        "--prune-conv2-channels", type=int, default=None, metavar="N", help="conv2 channels kept after pruning"
+    )
+    parser.add_argument("--prune-fc1-units", type=int, default=None, metavar="N", help="fc1 units kept after pruning")
+    parser.add_argument(
+        "--prune-steps", type=int, default=1, metavar="N", help="number of prune / fine-tune steps (default: 1)"
+    )
+    parser.add_argument(
+        "--prune-finetune-epochs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="fine-tuning epochs after every pruning step (default: 1)",
+    )
+    parser.add_argument(
+        "--prune-criterion",
+        type=str,
+        default="l1",
+        choices=["l1", "l2"],
+        help="weight magnitude norm ranking channels / units (default: l1)",
+    )
+
+    # knowledge distillation
+    parser.add_argument(
+        "--distill",
+        action="store_true",
+        default=False,
+        help="train a smaller student against the outputs of a trained teacher instead of training MNISTNet",
+    )
+    parser.add_argument(
+        "--teacher-model-name", type=str, default="mnist.pt", help="path to the trained MNISTNet teacher weights"
+    )
+    parser.add_argument(
+        "--student-arch",
+        type=str,
+        default="narrow",
+        choices=["narrow", "depthwise", "mlp"],
+        help="student architecture (default: narrow)",
+    )
+    parser.add_argument(
+        "--distill-temperature", type=float, default=4.0, metavar="T", help="softening temperature (default: 4.0)"
+    )
+    parser.add_argument(
+        "--distill-alpha",
+        type=float,
+        default=0.9,
+        metavar="A",
+        help="weight of the teacher soft targets vs. the hard labels (default: 0.9)",
+    )
+    parser.add_argument(
+        "--latency-budget-ms",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="p99 single-image latency budget the student is checked against",
+    )
+
+    # robustness
+    parser.add_argument(
+        "--robustness-eval",
+        action="store_true",
+        default=False,
+        help="evaluate accuracy under noise / blur / rotation / occlusion / FGSM / PGD after training",
+    )
+    parser.add_argument(
+        "--robustness-samples",
+        type=int,
+        default=2000,
+        metavar="N",
+        help="number of test samples used by the robustness evaluation (default: 2000)",
+    )
+
+    # memory tracking
+    parser.add_argument(
+        "--track-memory",
+        action="store_true",
+        default=False,
+        help="sample RSS / CUDA allocator / Python object counts and flag memory growth",
+    )
+    parser.add_argument(
+        "--memory-interval",
+        type=int,
+        default=0,
+        metavar="N",
+        help="batches between two memory samples, 0 for epoch boundaries only (default: 0)",
+    )
+    parser.add_argument(
+        "--memory-growth-threshold-mb",
+        type=float,
+        default=50.0,
+        metavar="MB",
+        help="RSS growth over --memory-window increasing samples flagged as a leak (default: 50)",
+    )
+    parser.add_argument(
+        "--memory-window",
+        type=int,
+        default=3,
+        metavar="N",
+        help="number of consecutive samples the RSS growth is checked over (default: 3)",
+    )
+    parser.add_argument(
+        "--tracemalloc-top",
+        type=int,
+        default=0,
+        metavar="N",
+        help="list the N allocation sites that grew the most with each leak warning, 0 to disable (default: 0)",
+    )
 
     # network params to add
     # None
@@ -39,4 +277,7 @@ def get_args():
     parser.add_argument("--use-pretrained", action="store_true", default=False, help="use pretrained weights")
     parser.add_argument("--pretrained-model-name", type=str, default="mnist.pt", help="path to pretrained weights")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.tune_cpu_layout and args.num_workers is not None:
+        parser.error("--num-workers cannot be combined with --tune-cpu-layout, which searches the number of workers")
+    return args
@@ -0,0 +1,119 @@
+"""
+This module evaluates many checkpoints in a single pass over the test data.
+
+Every batch is loaded and moved to the device once and then scored by all checkpoints. Checkpoints sharing the
+same architecture and layer widths are stacked and run together with `torch.func.vmap`, so K models cost a
+handful of batched kernels per batch rather than K separate passes over the data loader.
+"""
+# Standard library imports
+import argparse
+import copy
+
+# Other library imports
+import torch
+import torch.nn.functional as torch_fn
+
+# Local library imports
+from pytorch.data import get_dataloader
+from utils.utils_pytorch import load_model
+
+
+##### Public Functions #####
+def evaluate_checkpoints(model_names, device, data_loader, logger=None):
+    """
+    Scores several checkpoints against each batch as it is read.
+
+    Parameters
+    ----------
+    model_names: list
+        Checkpoint paths, loaded with `utils_pytorch.load_model`.
+    device: str
+        "cuda" or "cpu".
+    data_loader: object
+        Evaluation data.
+    logger: MetricsSink
+        Optional sink the metrics table is reported to.
+
+    Returns one dict per checkpoint with its "checkpoint" path, average "loss" and "accuracy", in input order.
+    """
+    models = [load_model(model_name).to(device).eval() for model_name in model_names]
+    groups = {}
+    for index, model in enumerate(models):
+        shapes = tuple((name, tuple(value.shape)) for name, value in model.state_dict().items())
+        groups.setdefault((type(model).__name__, shapes), []).append(index)
+    scorers = [(indices, _get_group_scorer([models[index] for index in indices])) for indices in groups.values()]
+
+    total_loss = torch.zeros(len(models), device=device)
+    correct = torch.zeros(len(models), dtype=torch.long, device=device)
+    with torch.no_grad():
+        for data, target in data_loader:
+            data, target = data.to(device), target.to(device)
+            for indices, scorer in scorers:
+                output = scorer(data)  # (K, N, classes)
+                losses = torch_fn.nll_loss(output.flatten(0, 1), target.repeat(len(indices)), reduction="none")
+                total_loss[indices] += losses.view(len(indices), -1).sum(dim=1)
+                correct[indices] += output.argmax(dim=2).eq(target).sum(dim=1)
+
+    num_samples = len(data_loader.dataset)
+    results = [
+        {"checkpoint": model_name, "loss": loss / num_samples, "accuracy": hits / num_samples}
+        for model_name, loss, hits in zip(model_names, total_loss.tolist(), correct.tolist())
+    ]
+    _report_results(results, logger)
+    return results
+
+
+def format_results(results):
+    """
+    Formats the results of `evaluate_checkpoints` as a text table.
+
+    Parameters
+    ----------
+    results: list
+        One dict per checkpoint.
+    """
+    width = max([len("checkpoint")] + [len(row["checkpoint"]) for row in results])
+    lines = [f"{'checkpoint':<{width}} {'loss':>8} {'accuracy':>9}"]
+    for row in results:
+        lines.append(f"{row['checkpoint']:<{width}} {row['loss']:>8.4f} {100.0 * row['accuracy']:>8.2f}%")
+    return "\n".join(lines)
+
+
+##### Private Functions #####
+def _get_group_scorer(models):
+    if len(models) == 1 or not hasattr(torch, "func"):
+        return lambda data: torch.stack([model(data) for model in models])
+
+    # one stacked copy of the weights, run by a stateless "meta" copy of the architecture
+    params, buffers = torch.func.stack_module_state(models)
+    base = copy.deepcopy(models[0]).to("meta")
+
+    def call(model_params, model_buffers, data):
+        return torch.func.functional_call(base, (model_params, model_buffers), (data,))
+
+    return lambda data: torch.func.vmap(call, in_dims=(0, 0, None))(params, buffers, data)
+
+
+def _report_results(results, logger):
+    text = format_results(results)
+    print(f"Checkpoint evaluation:\n{text}")
+    if logger is None:
+        return
+
+    for index, row in enumerate(results):
+        logger.report_scalar("checkpoints", "accuracy", value=row["accuracy"], iteration=index)
+        logger.report_scalar("checkpoints", "loss", value=row["loss"], iteration=index)
+    logger.report_text(f"Checkpoint evaluation:\n{text}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate several MNIST checkpoints in one pass")
+    parser.add_argument("checkpoints", nargs="+", help="checkpoint paths")
+    parser.add_argument("--test-batch-size", type=int, default=1000, help="input batch size (default: 1000)")
+    parser.add_argument("--no-cuda", action="store_true", default=False, help="disables CUDA evaluation")
+    cli_args = parser.parse_args()
+
+    eval_device = torch.device("cuda" if not cli_args.no_cuda and torch.cuda.is_available() else "cpu")
+    evaluate_checkpoints(
+        cli_args.checkpoints, eval_device, get_dataloader(cli_args.test_batch_size, is_train=False, to_shuffle=False)
+    )
@@ -4,7 +4,30 @@ import torch
 from torchvision import datasets, transforms
 
 
-def get_dataloader(batch_size, is_train, to_shuffle):
+class IndexedDataset(torch.utils.data.Dataset):
+    """
+    Dataset wrapper returning the index of every sample with it, e.g. to look up cached per-sample outputs.
+
+    Attributes
+    ----------
+    dataset: Dataset
+        Wrapped dataset yielding (data, target).
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        data, target = self.dataset[index]
+        return data, target, index
+
+
+def get_dataloader(
+    batch_size, is_train, to_shuffle, num_workers=0, worker_init_fn=None, num_samples=None, with_indices=False
+):
     """
     Retrives the MNIST dataset using pytorch DataLoader.
 
@@ -16,16 +39,35 @@ def get_dataloader(batch_size, is_train, to_shuffle):
         Determines if data is training or testing.
     to_shuffle: bool
         Dertermines if data should be shuffled.
+    num_workers: int
+        Number of worker processes loading the data (default: 0, load in the main process).
+    worker_init_fn: function
+        Called in each worker process on start-up, e.g. to pin it to the loader CPUs.
+    num_samples: int
+        Restricts the data to a fixed random subset of this size, e.g. for quick evaluations (default: None, all).
+    with_indices: bool
+        Yields (data, target, index) batches instead of (data, target) (default: False).
     """
+    dataset = datasets.MNIST(
+        os.path.join(".", "data"),
+        train=is_train,
+        download=True,
+        transform=transforms.Compose([transforms.ToTensor(), transforms.Normalize((0.1307,), (0.3081,))]),
+    )
+    if num_samples is not None and num_samples < len(dataset):
+        # the subset is drawn with its own generator so it is the same at every evaluation and run
+        indices = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(0))[:num_samples]
+        dataset = torch.utils.data.Subset(dataset, indices.tolist())
+    if with_indices:
+        dataset = IndexedDataset(dataset)
+
     data_loader = torch.utils.data.DataLoader(
-        datasets.MNIST(
-            os.path.join(".", "data"),
-            train=is_train,
-            download=True,
-            transform=transforms.Compose([transforms.ToTensor(), transforms.Normalize((0.1307,), (0.3081,))]),
-        ),
+        dataset,
         batch_size=batch_size,
         shuffle=to_shuffle,
+        num_workers=num_workers,
+        worker_init_fn=worker_init_fn,
+        persistent_workers=num_workers > 0,
     )
 
     return data_loader
@@ -0,0 +1,171 @@
+"""
+This module contains the knowledge distillation of a trained MNISTNet teacher into a smaller student network.
+
+The teacher is run once over the whole training set and its outputs are cached on the device, indexed by
+sample, so every distillation epoch only costs student forward / backward passes.
+"""
+# Other library imports
+import torch
+import torch.nn.functional as torch_fn
+
+# Local library imports
+from pytorch.network import MNISTNet, DepthwiseSeparableNet, MLPNet
+from utils.utils_pytorch import get_model_size, measure_latency
+
+STUDENT_ARCHS = ("narrow", "depthwise", "mlp")
+
+
+##### Public Functions #####
+def build_student(arch):
+    """
+    Builds a student network.
+
+    Parameters
+    ----------
+    arch: str
+        "narrow" (MNISTNet with 8/16 conv channels and 64 fc1 units), "depthwise" (depthwise separable conv2)
+        or "mlp" (784-128-10 perceptron, as the Keras model of tensorflow/main.py).
+    """
+    if arch == "narrow":
+        return MNISTNet(conv1_channels=8, conv2_channels=16, fc1_units=64)
+    if arch == "depthwise":
+        return DepthwiseSeparableNet()
+    if arch == "mlp":
+        return MLPNet()
+    raise ValueError(f"Unknown student architecture {arch}, expected one of {STUDENT_ARCHS}")
+
+
+def cache_teacher_outputs(teacher, device, data_loader):
+    """
+    Runs the teacher once over a data loader built `with_indices=True` and returns its outputs indexed by sample.
+
+    MNISTNet outputs log-probabilities; softening them with a temperature gives the same distribution as
+    softening the logits, so they are cached as-is.
+
+    Parameters
+    ----------
+    teacher: object
+        Trained teacher model.
+    device: str
+        "cuda" or "cpu".
+    data_loader: object
+        Loader yielding (data, target, index) batches.
+    """
+    teacher.eval()
+    outputs = None
+    with torch.no_grad():
+        for data, _, index in data_loader:
+            output = teacher(data.to(device))
+            if outputs is None:
+                outputs = torch.empty((len(data_loader.dataset), output.shape[1]), device=device)
+            outputs[index.to(device)] = output
+    return outputs
+
+
+def distillation_loss(output, teacher_output, target, temperature, alpha):
+    """
+    Computes the distillation loss: alpha * T^2 * KL(teacher || student) on softened outputs,
+    plus (1 - alpha) * the usual loss on the hard labels.
+
+    Parameters
+    ----------
+    output: object
+        Student log-probabilities.
+    teacher_output: object
+        Teacher log-probabilities (or logits).
+    target: object
+        Actual target labels.
+    temperature: float
+        Softening temperature.
+    alpha: float
+        Weight of the soft targets, between 0 and 1.
+    """
+    soft_loss = torch_fn.kl_div(
+        torch_fn.log_softmax(output / temperature, dim=1),
+        torch_fn.log_softmax(teacher_output / temperature, dim=1),
+        reduction="batchmean",
+        log_target=True,
+    )
+    hard_loss = torch_fn.nll_loss(output, target)
+    return alpha * temperature ** 2 * soft_loss + (1 - alpha) * hard_loss
+
+
+def train_distill(student, device, train_loader, teacher_outputs, optimizer, epoch, args, logger):
+    """
+    Trains the student for one epoch against the cached teacher outputs.
+
+    Parameters
+    ----------
+    student: object
+        Student model for training.
+    device: str
+        "cuda" or "cpu".
+    train_loader: object
+        Training data yielding (data, target, index) batches.
+    teacher_outputs: object
+        Teacher outputs indexed by sample, from `cache_teacher_outputs`.
+    optimizer: object
+        Neural network optimizer object.
+    epoch: int
+        Current epoch number.
+    args: object
+        Training arguments, for the temperature, alpha and log interval.
+    logger: MetricsSink
+        Metrics sink for reporting training metrics.
+    """
+    print(f"epoch {epoch}")
+    student.train()
+    for batch_idx, (data, target, index) in enumerate(train_loader):
+        data, target = data.to(device), target.to(device)
+        optimizer.zero_grad()
+        output = student(data)
+        loss = distillation_loss(
+            output, teacher_outputs[index.to(device)], target, args.distill_temperature, args.distill_alpha
+        )
+        loss.backward()
+        optimizer.step()
+
+        if batch_idx % args.log_interval == 0:
+            loss_value = loss.item()
+            logger.report_scalar("distill", "loss", iteration=(epoch * len(train_loader) + batch_idx), value=loss_value)
+            print(
+                f"Distill Epoch: {epoch} [{batch_idx * len(data)}/{len(train_loader.dataset)} "
+                f"({100.0 * batch_idx / len(train_loader):.0f}%)] Loss: {loss_value:.6f}"
+            )
+
+
+def report_latency_accuracy(models, device, evaluate_fn, latency_budget_ms=None, logger=None):
+    """
+    Reports the size, latency (single image) and accuracy of each model, e.g. teacher vs. student.
+
+    Parameters
+    ----------
+    models: dict
+        Name to model.
+    device: str
+        "cuda" or "cpu".
+    evaluate_fn: function
+        Called with a model, returns its accuracy.
+    latency_budget_ms: float
+        Optional p99 latency budget each model is checked against.
+    logger: MetricsSink
+        Optional sink the table is reported to.
+    """
+    lines = [f"{'model':<10} {'params':>9} {'p50 ms':>7} {'p99 ms':>7} {'accuracy':>9} {'in budget':>9}"]
+    for name, model in models.items():
+        num_params, _ = get_model_size(model)
+        latency = measure_latency(model, device)
+        accuracy = evaluate_fn(model)
+        in_budget = "-" if latency_budget_ms is None else str(latency["p99_ms"] <= latency_budget_ms)
+        lines.append(
+            f"{name:<10} {num_params:>9} {latency['p50_ms']:>7.3f} {latency['p99_ms']:>7.3f} "
+            f"{100.0 * accuracy:>8.2f}% {in_budget:>9}"
+        )
+        if logger is not None:
+            logger.report_scalar("distill latency", f"{name} p99_ms", value=latency["p99_ms"], iteration=0)
+            logger.report_scalar("distill accuracy", name, value=accuracy, iteration=0)
+
+    text = "Latency vs. accuracy:\n" + "\n".join(lines)
+    print(text)
+    if logger is not None:
+        logger.report_text(text)
@@ -0,0 +1,81 @@
+"""This module contains the controller deciding when training has stopped paying off."""
+import time
+
+
+class StoppingController:
+    """
+    Stops training once a target accuracy is reached or the accuracy has plateaued.
+
+    Attributes
+    ----------
+    target_accuracy: float
+        Accuracy (0-1) at which training stops, None to disable.
+    patience: int
+        Number of evaluations without improvement after which training stops, 0 to disable.
+    min_delta: float
+        Minimum accuracy increase counted as an improvement.
+    best_accuracy: float
+        Best accuracy seen so far.
+    time_to_target: float
+        Seconds from the start of training until the target was first reached, None until then.
+    stop_reason: str
+        Why training should stop, None while it should continue.
+
+    Methods
+    -------
+    update(accuracy=float)
+        Records an evaluation for plateau detection, returns True on improvement.
+    check_target(accuracy=float)
+        Records a (full) evaluation against the target, returns True once it is reached.
+    """
+
+    def __init__(self, target_accuracy=None, patience=0, min_delta=0.0):
+        self.target_accuracy = target_accuracy
+        self.patience = patience
+        self.min_delta = min_delta
+        self.best_accuracy = 0.0
+        self.time_to_target = None
+        self.stop_reason = None
+        self._num_bad_evals = 0
+        self._start_time = time.perf_counter()
+
+    @property
+    def should_stop(self):
+        """True once the target is reached or the accuracy has plateaued."""
+        return self.stop_reason is not None
+
+    def update(self, accuracy):
+        """
+        Records an evaluation for plateau detection.
+
+        Parameters
+        ----------
+        accuracy: float
+            Accuracy of the evaluation, full or on a subset.
+        """
+        if accuracy > self.best_accuracy + self.min_delta:
+            self.best_accuracy = accuracy
+            self._num_bad_evals = 0
+            return True
+
+        self._num_bad_evals += 1
+        if self.patience and self._num_bad_evals >= self.patience and self.stop_reason is None:
+            self.stop_reason = f"no improvement above {self.best_accuracy:.4f} in {self._num_bad_evals} evaluations"
+        return False
+
+    def check_target(self, accuracy):
+        """
+        Records an evaluation against the target accuracy. Only full evaluations should be checked.
+
+        Parameters
+        ----------
+        accuracy: float
+            Accuracy of the full evaluation.
+        """
+        if self.target_accuracy is None or accuracy < self.target_accuracy:
+            return False
+
+        if self.time_to_target is None:
+            self.time_to_target = time.perf_counter() - self._start_time
+            self.stop_reason = f"target accuracy {self.target_accuracy:.4f} reached in {self.time_to_target:.1f}s"
+        return True
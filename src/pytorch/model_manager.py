@@ -0,0 +1,202 @@
+"""
+This module contains the model manager used by serving processes.
+
+Checkpoints are addressed by name and version, loaded from local disk or from the model bucket through
+S3Utils, and kept warm (eval mode, on device, one forward pass done) in a bounded LRU cache. Concurrent requests
+for the same version share a single load, and the active version is swapped atomically: requests already running
+keep the model they started with.
+"""
+# Standard library imports
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Other library imports
+import torch
+
+# Local library imports
+from utils.utils_pytorch import load_model
+
+
+class ModelManager:
+    """
+    Multi-version model cache with hot-swap of the active version.
+
+    Attributes
+    ----------
+    model_dir: str
+        Local directory holding the checkpoints as <model_dir>/<name>/<version>.pt.
+    s3_utils: S3Utils
+        Optional S3 connection; checkpoints missing locally are downloaded from <s3_prefix>/<name>/<version>.pt.
+    s3_bucket: str
+        Bucket holding the checkpoints, e.g. the "model_bucket" of the S3 config (default: the S3Utils bucket).
+    s3_prefix: str
+        Prefix of the checkpoints in the S3 bucket.
+    capacity: int
+        Maximum number of models kept in memory. The active model is never evicted.
+    device: str
+        "cuda" or "cpu".
+
+    Methods
+    -------
+    get(name=str, version=str)
+        Returns the warmed model of a version, loading it if needed.
+    activate(name=str, version=str)
+        Loads a version and makes it the active one.
+    predict(data=object)
+        Runs the active model on a batch.
+    add_swap_listener(listener=function)
+        Registers a function called with (previous, new) version keys on every swap.
+    """
+
+    def __init__(self, model_dir, s3_utils=None, s3_prefix="", capacity=3, device="cpu", s3_bucket=None):
+        self.model_dir = model_dir
+        self.s3_utils = s3_utils
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix
+        self.capacity = capacity
+        self.device = torch.device(device)
+
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        self._loading = {}
+        self._active = (None, None)
+        self._swap_listeners = []
+
+    @property
+    def active_version(self):
+        """(name, version) of the active model, None before the first activation."""
+        return self._active[0]
+
+    @property
+    def cached_versions(self):
+        """(name, version) of the models in memory, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def get(self, name, version):
+        """
+        Returns the warmed model of a version, loading it if it is not cached.
+        Concurrent calls for a version being loaded wait for that load instead of starting their own.
+
+        Parameters
+        ----------
+        name: str
+            Model name.
+        version: str
+            Model version.
+        """
+        key = (name, str(version))
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            pending = self._loading.get(key)
+            is_loader = pending is None
+            if is_loader:
+                pending = self._loading[key] = Future()
+
+        if not is_loader:
+            return pending.result()
+
+        try:
+            model = self._load(*key)
+        except Exception as e:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._models[key] = model
+            self._evict()
+            del self._loading[key]
+        pending.set_result(model)
+        return model
+
+    def activate(self, name, version):
+        """
+        Loads a version (if needed) and atomically makes it the active one.
+
+        Parameters
+        ----------
+        name: str
+            Model name.
+        version: str
+            Model version.
+
+        Returns the (name, version) key of the previously active model.
+        """
+        model = self.get(name, version)
+        key = (name, str(version))
+        with self._lock:
+            previous = self._active[0]
+            # a single reference assignment: readers see either the old or the new (key, model) pair
+            self._active = (key, model)
+            self._models[key] = model
+            self._models.move_to_end(key)
+            self._evict()
+            listeners = list(self._swap_listeners)
+        print(f"Model manager - active model swapped from {previous} to {key}")
+        for listener in listeners:
+            listener(previous, key)
+        return previous
+
+    def predict(self, data):
+        """
+        Runs the active model on a batch of normalised images.
+
+        Parameters
+        ----------
+        data: object
+            Tensor of shape (N, 1, 28, 28).
+
+        Returns the model output and the (name, version) key of the model that produced it.
+        """
+        key, model = self._active
+        if model is None:
+            raise RuntimeError("No active model, call activate() first")
+        with torch.no_grad():
+            return model(data.to(self.device)), key
+
+    def add_swap_listener(self, listener):
+        """
+        Registers a function called with the (previous, new) version keys every time the active model is swapped.
+
+        Parameters
+        ----------
+        listener: function
+            Function taking two (name, version) keys; the previous one is None on the first activation.
+        """
+        with self._lock:
+            self._swap_listeners.append(listener)
+
+    def _load(self, name, version):
+        local_path = os.path.join(self.model_dir, name, f"{version}.pt")
+        if not os.path.exists(local_path):
+            if self.s3_utils is None:
+                raise FileNotFoundError(f"Model {name} version {version} not found at {local_path}")
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            s3_key = "/".join(part for part in (self.s3_prefix.strip("/"), name, f"{version}.pt") if part)
+            if not self.s3_utils.download_file(s3_key=s3_key, local_path=local_path, bucket=self.s3_bucket, verbose=0):
+                raise RuntimeError(f"Could not download model {name} version {version} from {s3_key}")
+
+        model = load_model(local_path)
+        if model is None:
+            raise RuntimeError(f"Could not load model {name} version {version} from {local_path}")
+        model = model.to(self.device).eval()
+
+        # warm-up pass so the first request does not pay for lazy initialisation
+        with torch.no_grad():
+            model(torch.zeros(1, 1, 28, 28, device=self.device))
+        return model
+
+    def _evict(self):
+        # caller holds the lock
+        active_key = self._active[0]
+        for key in list(self._models):
+            if len(self._models) <= self.capacity:
+                break
+            if key != active_key:
+                del self._models[key]
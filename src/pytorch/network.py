@@ -25,12 +25,22 @@ class MNISTNet(nn.Module):
         Constructs the neural network.
     """
 
-    def __init__(self):
+    def __init__(self, conv1_channels=20, conv2_channels=50, fc1_units=500):
+        """
+        Parameters
+        ----------
+        conv1_channels: int
+            Output channels of conv1 (default: 20)
+        conv2_channels: int
+            Output channels of conv2 (default: 50)
+        fc1_units: int
+            Output units of fc1 (default: 500)
+        """
         super(MNISTNet, self).__init__()
-        self.conv1 = nn.Conv2d(1, 20, 5, 1)
-        self.conv2 = nn.Conv2d(20, 50, 5, 1)
-        self.fc1 = nn.Linear(4 * 4 * 50, 500)
-        self.fc2 = nn.Linear(500, 10)
+        self.conv1 = nn.Conv2d(1, conv1_channels, 5, 1)
+        self.conv2 = nn.Conv2d(conv1_channels, conv2_channels, 5, 1)
+        self.fc1 = nn.Linear(4 * 4 * conv2_channels, fc1_units)
+        self.fc2 = nn.Linear(fc1_units, 10)
 
     def forward(self, x):
         """Constructs the neural network.
@@ -43,7 +53,141 @@ class MNISTNet(nn.Module):
         x = fn.max_pool2d(x, 2, 2)
         x = fn.relu(self.conv2(x))
         x = fn.max_pool2d(x, 2, 2)
-        x = x.view(-1, 4 * 4 * 50)
+        x = x.view(-1, 4 * 4 * self.conv2.out_channels)
+        x = fn.relu(self.fc1(x))
+        x = self.fc2(x)
+        return fn.log_softmax(x, dim=1)
+
+
+class DepthwiseSeparableNet(nn.Module):
+    """
+    Smaller student network for MNIST where conv2 is replaced by a depthwise separable convolution
+
+    Attributes
+    ----------
+    conv1: Conv2d
+        1st 2D convolution layer
+    depthwise: Conv2d
+        Per-channel 2D convolution layer
+    pointwise: Conv2d
+        1x1 convolution layer mixing the channels
+    fc1: Linear
+        1st linear layer
+    fc2: Linear
+        2nd linear layer
+
+    Methods
+    -------
+    forward(x=object)
+        Constructs the neural network.
+    """
+
+    def __init__(self, conv1_channels=16, conv2_channels=32, fc1_units=64):
+        """
+        Parameters
+        ----------
+        conv1_channels: int
+            Output channels of conv1, also the channels of the depthwise convolution (default: 16)
+        conv2_channels: int
+            Output channels of the pointwise convolution (default: 32)
+        fc1_units: int
+            Output units of fc1 (default: 64)
+        """
+        super(DepthwiseSeparableNet, self).__init__()
+        self.conv1 = nn.Conv2d(1, conv1_channels, 5, 1)
+        self.depthwise = nn.Conv2d(conv1_channels, conv1_channels, 5, 1, groups=conv1_channels)
+        self.pointwise = nn.Conv2d(conv1_channels, conv2_channels, 1)
+        self.fc1 = nn.Linear(4 * 4 * conv2_channels, fc1_units)
+        self.fc2 = nn.Linear(fc1_units, 10)
+
+    def forward(self, x):
+        """Constructs the neural network.
+        Parameters
+        ----------
+        x: object
+            Holds the built network construct
+        """
+        x = fn.relu(self.conv1(x))
+        x = fn.max_pool2d(x, 2, 2)
+        x = fn.relu(self.pointwise(self.depthwise(x)))
+        x = fn.max_pool2d(x, 2, 2)
+        x = x.view(-1, 4 * 4 * self.pointwise.out_channels)
         x = fn.relu(self.fc1(x))
         x = self.fc2(x)
         return fn.log_softmax(x, dim=1)
+
+
+class MLPNet(nn.Module):
+    """
+    Multi-layer perceptron for MNIST, the PyTorch counterpart of the Keras model in tensorflow/main.py
+
+    Attributes
+    ----------
+    fc1: Linear
+        Hidden linear layer
+    fc2: Linear
+        Output linear layer
+
+    Methods
+    -------
+    forward(x=object)
+        Constructs the neural network.
+    """
+
+    def __init__(self, hidden_units=128):
+        """
+        Parameters
+        ----------
+        hidden_units: int
+            Output units of fc1 (default: 128)
+        """
+        super(MLPNet, self).__init__()
+        self.fc1 = nn.Linear(28 * 28, hidden_units)
+        self.fc2 = nn.Linear(hidden_units, 10)
+
+    def forward(self, x):
+        """Constructs the neural network.
+        Parameters
+        ----------
+        x: object
+            Holds the built network construct
+        """
+        x = x.view(-1, 28 * 28)
+        x = fn.relu(self.fc1(x))
+        x = self.fc2(x)
+        return fn.log_softmax(x, dim=1)
+
+
+def get_widths(state_dict):
+    """
+    Reads the MNISTNet layer widths from a state dict, so compact (pruned) models can be rebuilt.
+    Widths missing from the state dict keep their default value.
+
+    Parameters
+    ----------
+    state_dict: dict
+        MNISTNet weights.
+    """
+    layers = {"conv1_channels": "conv1.weight", "conv2_channels": "conv2.weight", "fc1_units": "fc1.weight"}
+    return {width: state_dict[key].shape[0] for width, key in layers.items() if key in state_dict}
+
+
+def build_model(state_dict):
+    """
+    Builds the network matching a state dict: MNISTNet, DepthwiseSeparableNet or MLPNet, with the widths of the
+    weights. Weights are not loaded.
+
+    Parameters
+    ----------
+    state_dict: dict
+        Network weights.
+    """
+    if "depthwise.weight" in state_dict:
+        return DepthwiseSeparableNet(
+            conv1_channels=state_dict["conv1.weight"].shape[0],
+            conv2_channels=state_dict["pointwise.weight"].shape[0],
+            fc1_units=state_dict["fc1.weight"].shape[0],
+        )
+    if "conv1.weight" not in state_dict and "fc1.weight" in state_dict and state_dict["fc1.weight"].shape[1] == 28 * 28:
+        return MLPNet(state_dict["fc1.weight"].shape[0])
+    return MNISTNet(**get_widths(state_dict))
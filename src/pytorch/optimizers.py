@@ -0,0 +1,124 @@
+"""This module contains layer-wise adaptive optimizers for large-batch training."""
+import torch
+from torch.optim import Optimizer
+
+
+class LARS(Optimizer):
+    """
+    SGD with momentum and layer-wise adaptive rate scaling (You et al., 2017).
+
+    Each layer's step is scaled by a trust ratio `trust_coefficient * ||w|| / ||g||`, which keeps updates
+    proportional to the weights and allows much larger learning rates / batch sizes than plain SGD.
+    1D parameters (biases) are updated with plain momentum SGD and no weight decay.
+
+    Attributes
+    ----------
+    params: iterable
+        Parameters to optimize.
+    lr: float
+        Learning rate.
+    momentum: float
+        Momentum factor.
+    weight_decay: float
+        L2 penalty.
+    trust_coefficient: float
+        Scale of the layer-wise trust ratio.
+    """
+
+    def __init__(self, params, lr, momentum=0.9, weight_decay=0.0, trust_coefficient=0.001):
+        defaults = dict(lr=lr, momentum=momentum, weight_decay=weight_decay, trust_coefficient=trust_coefficient)
+        super(LARS, self).__init__(params, defaults)
+
+    @torch.no_grad()
+    def step(self, closure=None):
+        """Performs a single optimization step."""
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+
+        for group in self.param_groups:
+            for param in group["params"]:
+                if param.grad is None:
+                    continue
+                grad = param.grad
+                if param.ndim > 1:
+                    if group["weight_decay"] != 0:
+                        grad = grad.add(param, alpha=group["weight_decay"])
+                    grad = grad.mul(_trust_ratio(param, grad, group["trust_coefficient"]))
+
+                state = self.state[param]
+                if "momentum_buffer" not in state:
+                    state["momentum_buffer"] = torch.clone(grad).detach()
+                else:
+                    state["momentum_buffer"].mul_(group["momentum"]).add_(grad)
+                param.add_(state["momentum_buffer"], alpha=-group["lr"])
+
+        return loss
+
+
+class LAMB(Optimizer):
+    """
+    Adam with decoupled weight decay and layer-wise trust ratio (You et al., 2019).
+
+    Attributes
+    ----------
+    params: iterable
+        Parameters to optimize.
+    lr: float
+        Learning rate.
+    betas: tuple
+        Coefficients of the running averages of the gradient and its square.
+    eps: float
+        Term added to the denominator for numerical stability.
+    weight_decay: float
+        Decoupled weight decay.
+    """
+
+    def __init__(self, params, lr, betas=(0.9, 0.999), eps=1e-6, weight_decay=0.0):
+        defaults = dict(lr=lr, betas=betas, eps=eps, weight_decay=weight_decay)
+        super(LAMB, self).__init__(params, defaults)
+
+    @torch.no_grad()
+    def step(self, closure=None):
+        """Performs a single optimization step."""
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+
+        for group in self.param_groups:
+            beta1, beta2 = group["betas"]
+            for param in group["params"]:
+                if param.grad is None:
+                    continue
+                grad = param.grad
+
+                state = self.state[param]
+                if not state:
+                    state["step"] = 0
+                    state["exp_avg"] = torch.zeros_like(param)
+                    state["exp_avg_sq"] = torch.zeros_like(param)
+                state["step"] += 1
+                state["exp_avg"].mul_(beta1).add_(grad, alpha=1 - beta1)
+                state["exp_avg_sq"].mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+
+                exp_avg_hat = state["exp_avg"] / (1 - beta1 ** state["step"])
+                exp_avg_sq_hat = state["exp_avg_sq"] / (1 - beta2 ** state["step"])
+                update = exp_avg_hat / (exp_avg_sq_hat.sqrt() + group["eps"])
+                if param.ndim > 1:
+                    if group["weight_decay"] != 0:
+                        update.add_(param, alpha=group["weight_decay"])
+                    update.mul_(_trust_ratio(param, update, 1.0))
+                param.add_(update, alpha=-group["lr"])
+
+        return loss
+
+
+##### Private Functions #####
+def _trust_ratio(param, update, trust_coefficient):
+    param_norm = torch.linalg.vector_norm(param)
+    update_norm = torch.linalg.vector_norm(update)
+    ratio = trust_coefficient * param_norm / update_norm
+    # fall back to a ratio of 1 while the weights or the update are still all zeros
+    return torch.where((param_norm > 0) & (update_norm > 0), ratio, torch.ones_like(ratio))
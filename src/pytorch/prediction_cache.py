@@ -0,0 +1,241 @@
+"""
+This module contains the optional prediction cache placed in front of the ModelManager inference path.
+
+Each preprocessed image is keyed by a fast hash of its tensor bytes plus the model version, so exact duplicates
+(retries, replays, test harnesses) are answered from memory. Entries are evicted by size (LRU) and age (TTL),
+and the entries of a model version are dropped as soon as another version is activated.
+"""
+# Standard library imports
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Other library imports
+import torch
+
+
+class PredictionCache:
+    """
+    Size-bounded LRU / TTL cache of per-image model outputs.
+
+    Attributes
+    ----------
+    capacity: int
+        Maximum number of cached outputs.
+    ttl: float
+        Seconds an output stays valid, None for no expiry.
+    hits: int
+        Number of lookups answered from the cache.
+    misses: int
+        Number of lookups not found (or expired) in the cache.
+    evictions: int
+        Number of outputs evicted for size or age.
+
+    Methods
+    -------
+    make_key(sample=np.ndarray, version=tuple)
+        Returns the cache key of one preprocessed image for a model version.
+    get(key=tuple)
+        Returns the cached output or None.
+    put(key=tuple, output=object)
+        Caches an output.
+    invalidate(version=tuple)
+        Drops the outputs of one model version, or all of them.
+    record_hits(count=int)
+        Counts lookups answered without the cache, e.g. duplicates within a batch.
+    stats()
+        Returns the hit / miss counters and hit rate.
+    """
+
+    def __init__(self, capacity=10000, ttl=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(sample, version):
+        """
+        Returns the cache key of one preprocessed image for a model version.
+
+        Parameters
+        ----------
+        sample: np.ndarray
+            Contiguous preprocessed image.
+        version: tuple
+            (name, version) of the model.
+        """
+        digest = hashlib.blake2b(memoryview(sample).cast("B"), digest_size=16)
+        digest.update(f"{sample.dtype}{sample.shape}".encode())
+        return version, digest.digest()
+
+    def get(self, key):
+        """
+        Returns the cached output of a key, or None on a miss.
+
+        Parameters
+        ----------
+        key: tuple
+            Key from `make_key`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, output):
+        """
+        Caches the output of a key, evicting the least recently used outputs when full.
+
+        Parameters
+        ----------
+        key: tuple
+            Key from `make_key`.
+        output: object
+            Model output of that image.
+        """
+        expiry = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expiry, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        """
+        Drops the cached outputs of one model version, or all outputs.
+
+        Parameters
+        ----------
+        version: tuple
+            (name, version) of the model, None to clear the whole cache.
+        """
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == version]:
+                del self._entries[key]
+
+    def record_hits(self, count):
+        """
+        Counts lookups answered without querying the cache, e.g. duplicates of an image within a batch.
+
+        Parameters
+        ----------
+        count: int
+            Number of lookups.
+        """
+        with self._lock:
+            self.hits += count
+
+    def stats(self):
+        """Returns the hit / miss / eviction counters, the hit rate and the number of cached outputs."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def report(self, logger, iteration):
+        """
+        Reports the cache statistics as scalars.
+
+        Parameters
+        ----------
+        logger: MetricsSink
+            Sink the statistics are reported to.
+        iteration: int
+            Iteration of the report.
+        """
+        for name, value in self.stats().items():
+            logger.report_scalar("prediction cache", name, value=value, iteration=iteration)
+
+
+class CachedPredictor:
+    """
+    Inference path of a ModelManager with a PredictionCache in front of it.
+
+    Only the images of a batch missing from the cache are run through the model, and duplicates within a batch
+    are run once. The cache entries of the previous model version are dropped on every swap.
+
+    Attributes
+    ----------
+    manager: ModelManager
+        Manager providing the active model.
+    cache: PredictionCache
+        Cache of per-image outputs.
+
+    Methods
+    -------
+    predict(data=object)
+        Returns the outputs of a batch of preprocessed images.
+    """
+
+    def __init__(self, manager, cache):
+        self.manager = manager
+        self.cache = cache
+        manager.add_swap_listener(lambda previous, _: cache.invalidate(previous) if previous else None)
+
+    def predict(self, data):
+        """
+        Returns the outputs of a batch of preprocessed images.
+
+        Parameters
+        ----------
+        data: object
+            Tensor of shape (N, 1, 28, 28).
+        """
+        version = self.manager.active_version
+        if version is None:
+            raise RuntimeError("No active model, call activate() first")
+
+        samples = data.detach().cpu().contiguous().numpy()
+        positions_by_key = {}
+        for position, sample in enumerate(samples):
+            positions_by_key.setdefault(self.cache.make_key(sample, version), []).append(position)
+        # duplicates within the batch are looked up once and answered without compute: they count as hits
+        self.cache.record_hits(len(samples) - len(positions_by_key))
+
+        outputs = [None] * len(samples)
+        missing = {}
+        for key, positions in positions_by_key.items():
+            output = self.cache.get(key)
+            if output is None:
+                missing[key] = positions
+            for position in positions:
+                outputs[position] = output
+
+        if missing:
+            first_positions = [positions[0] for positions in missing.values()]
+            computed, used_version = self.manager.predict(data[first_positions])
+            computed = computed.cpu()
+            for (key, positions), output in zip(missing.items(), computed):
+                # a swap may have happened since the lookup: only cache outputs under the version that made them
+                if used_version == version:
+                    # a row is a view of the batch output: clone it so the entry does not pin the whole batch
+                    self.cache.put(key, output.clone())
+                for position in positions:
+                    outputs[position] = output
+
+        return torch.stack(outputs)
@@ -0,0 +1,191 @@
+"""
+This module contains the structured pruning of MNISTNet.
+
+Instead of masking weights, the least important conv channels / fc1 units are physically removed: the kept
+rows and columns are copied into a smaller dense MNISTNet, which is faster and saves with fewer weights.
+`utils_pytorch.load_model` rebuilds such compact models from the shapes of their weights.
+"""
+# Other library imports
+import torch
+
+# Local library imports
+from pytorch.network import MNISTNet
+from utils.utils_pytorch import get_model_size, measure_latency
+
+PRUNING_CRITERIA = ("l1", "l2")
+
+
+##### Public Functions #####
+def get_importance(model, criterion="l1"):
+    """
+    Scores every conv1 channel, conv2 channel and fc1 unit by weight magnitude.
+
+    A unit's score is the norm of its incoming weights times the norm of its outgoing weights,
+    so units that are either barely fed or barely used both rank low.
+
+    Parameters
+    ----------
+    model: MNISTNet
+        Model to score.
+    criterion: str
+        "l1" or "l2" norm of the weights (default: "l1").
+
+    Returns a dict with one score tensor per prunable layer: "conv1", "conv2" and "fc1".
+    """
+    order = 1 if criterion == "l1" else 2
+    conv1, conv2, fc1, fc2 = model.conv1.weight, model.conv2.weight, model.fc1.weight, model.fc2.weight
+
+    with torch.no_grad():
+        # fc1 columns are grouped per conv2 channel: (fc1_units, conv2_channels, 4 * 4)
+        fc1_per_channel = fc1.view(fc1.shape[0], conv2.shape[0], -1)
+        return {
+            "conv1": _norm(conv1, dims=(1, 2, 3), order=order) * _norm(conv2, dims=(0, 2, 3), order=order),
+            "conv2": _norm(conv2, dims=(1, 2, 3), order=order) * _norm(fc1_per_channel, dims=(0, 2), order=order),
+            "fc1": _norm(fc1, dims=(1,), order=order) * _norm(fc2, dims=(0,), order=order),
+        }
+
+
+def shrink(model, conv1_channels=None, conv2_channels=None, fc1_units=None, criterion="l1"):
+    """
+    Returns a smaller dense MNISTNet keeping the most important channels / units of the model.
+
+    Parameters
+    ----------
+    model: MNISTNet
+        Model to prune. It is left unchanged.
+    conv1_channels: int
+        Number of conv1 channels kept (default: None, keep all).
+    conv2_channels: int
+        Number of conv2 channels kept (default: None, keep all).
+    fc1_units: int
+        Number of fc1 units kept (default: None, keep all).
+    criterion: str
+        "l1" or "l2" weight magnitude criterion (default: "l1").
+    """
+    importance = get_importance(model, criterion)
+    keep_conv1 = _top_indices(importance["conv1"], conv1_channels)
+    keep_conv2 = _top_indices(importance["conv2"], conv2_channels)
+    keep_fc1 = _top_indices(importance["fc1"], fc1_units)
+
+    compact = MNISTNet(len(keep_conv1), len(keep_conv2), len(keep_fc1)).to(model.fc1.weight.device)
+    # fc1 input features are laid out channel by channel, 4 * 4 features per conv2 channel
+    spatial = model.fc1.in_features // model.conv2.out_channels
+    keep_fc1_inputs = (keep_conv2.view(-1, 1) * spatial + torch.arange(spatial, device=keep_conv2.device)).flatten()
+
+    with torch.no_grad():
+        compact.conv1.weight.copy_(model.conv1.weight[keep_conv1])
+        compact.conv1.bias.copy_(model.conv1.bias[keep_conv1])
+        compact.conv2.weight.copy_(model.conv2.weight[keep_conv2][:, keep_conv1])
+        compact.conv2.bias.copy_(model.conv2.bias[keep_conv2])
+        compact.fc1.weight.copy_(model.fc1.weight[keep_fc1][:, keep_fc1_inputs])
+        compact.fc1.bias.copy_(model.fc1.bias[keep_fc1])
+        compact.fc2.weight.copy_(model.fc2.weight[:, keep_fc1])
+        compact.fc2.bias.copy_(model.fc2.bias)
+    return compact
+
+
+def prune(model, device, finetune_fn, evaluate_fn, target_widths, num_steps=1, criterion="l1", logger=None):
+    """
+    Iteratively shrinks the model towards the target widths, fine-tuning after every step.
+
+    Widths decrease geometrically from the current ones to the targets over `num_steps` steps.
+    Size, latency and accuracy are measured before pruning and after every step.
+
+    Parameters
+    ----------
+    model: MNISTNet
+        Trained model to prune.
+    device: str
+        "cuda" or "cpu".
+    finetune_fn: function
+        Called with the compact model after every step to fine-tune it (e.g. a few epochs of `train`).
+    evaluate_fn: function
+        Called with a model, returns its accuracy.
+    target_widths: dict
+        Target "conv1_channels", "conv2_channels" and / or "fc1_units"; missing layers are not pruned.
+    num_steps: int
+        Number of prune / fine-tune steps (default: 1).
+    criterion: str
+        "l1" or "l2" weight magnitude criterion (default: "l1").
+    logger: MetricsSink
+        Optional sink the trade-off table is reported to.
+
+    Returns the compact model and the list of measured trade-offs, one dict per step.
+    """
+    start_widths = {
+        "conv1_channels": model.conv1.out_channels,
+        "conv2_channels": model.conv2.out_channels,
+        "fc1_units": model.fc1.out_features,
+    }
+    report = [_measure(model, device, evaluate_fn, step=0)]
+
+    for step in range(1, num_steps + 1):
+        widths = {
+            name: _interpolate_width(start, target_widths.get(name) or start, step / num_steps)
+            for name, start in start_widths.items()
+        }
+        model = shrink(model, criterion=criterion, **widths)
+        finetune_fn(model)
+        report.append(_measure(model, device, evaluate_fn, step=step))
+
+    _report_tradeoffs(report, logger)
+    return model, report
+
+
+def format_report(report):
+    """
+    Formats the trade-offs returned by `prune` as a text table.
+
+    Parameters
+    ----------
+    report: list
+        One dict per pruning step.
+    """
+    lines = [f"{'step':>4} {'widths':>14} {'params':>9} {'KB':>8} {'p50 ms':>7} {'p99 ms':>7} {'accuracy':>9}"]
+    for row in report:
+        lines.append(
+            f"{row['step']:>4} {row['widths']:>14} {row['params']:>9} {row['bytes'] / 1024:>8.1f} "
+            f"{row['p50_ms']:>7.3f} {row['p99_ms']:>7.3f} {100.0 * row['accuracy']:>8.2f}%"
+        )
+    return "\n".join(lines)
+
+
+##### Private Functions #####
+def _norm(weight, dims, order):
+    return weight.abs().pow(order).sum(dim=dims).pow(1.0 / order)
+
+
+def _top_indices(scores, num_kept):
+    if num_kept is None or num_kept >= len(scores):
+        return torch.arange(len(scores), device=scores.device)
+    # kept units stay in their original order
+    return scores.topk(max(1, num_kept)).indices.sort().values
+
+
+def _interpolate_width(start, target, fraction):
+    return max(target, round(start * (target / start) ** fraction))
+
+
+def _measure(model, device, evaluate_fn, step):
+    num_params, num_bytes = get_model_size(model)
+    row = {
+        "step": step,
+        "widths": f"{model.conv1.out_channels}/{model.conv2.out_channels}/{model.fc1.out_features}",
+        "params": num_params,
+        "bytes": num_bytes,
+        "accuracy": evaluate_fn(model),
+    }
+    row.update(measure_latency(model, device))
+    return row
+
+
+def _report_tradeoffs(report, logger):
+    text = format_report(report)
+    print(f"Pruning trade-offs (widths conv1/conv2/fc1):\n{text}")
+    if logger is None:
+        return
+
+    for row in report:
+        for series in ("params", "p50_ms", "p99_ms", "accuracy"):
+            logger.report_scalar("pruning", series, value=row[series], iteration=row["step"])
+    logger.report_text(f"Pruning trade-offs (widths conv1/conv2/fc1):\n{text}")
@@ -0,0 +1,209 @@
+"""
+This module contains the batched robustness (brittleness) evaluation of a trained model.
+
+Each perturbation is applied to whole batches at every severity at once: the perturbed copies are stacked
+along the batch dimension and scored in a single forward pass, so a full suite only costs a few passes per batch.
+"""
+# Standard library imports
+import math
+
+# Other library imports
+import torch
+import torch.nn.functional as torch_fn
+
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+
+DEFAULT_SEVERITIES = {
+    "gaussian_noise": (0.1, 0.2, 0.3, 0.5),  # noise std, in pixel intensity
+    "blur": (0.5, 1.0, 1.5, 2.0),  # gaussian kernel sigma, in pixels
+    "rotation": (10.0, 20.0, 30.0, 45.0),  # degrees
+    "occlusion": (4, 8, 12, 16),  # side of the occluding square, in pixels
+    "fgsm": (0.05, 0.1, 0.2, 0.3),  # L-inf budget, in pixel intensity
+    "pgd": (0.05, 0.1, 0.2, 0.3),  # L-inf budget, in pixel intensity
+}
+
+
+##### Public Functions #####
+def evaluate_robustness(model, device, data_loader, severities=None, pgd_steps=10, logger=None, seed=0):
+    """
+    Measures the accuracy of the model under each perturbation and severity.
+
+    Parameters
+    ----------
+    model: object
+        Neural network model to evaluate.
+    device: str
+        "cuda" or "cpu".
+    data_loader: object
+        Evaluation data (normalised as for training).
+    severities: dict
+        Perturbation name to tuple of severities (default: DEFAULT_SEVERITIES).
+    pgd_steps: int
+        Number of PGD iterations (default: 10).
+    logger: MetricsSink
+        Optional sink the accuracy-vs-severity table is reported to.
+    seed: int
+        Seed of the random perturbations (default: 0).
+
+    Returns a dict mapping each perturbation name to a list of (severity, accuracy), plus "clean": [(0, accuracy)].
+    """
+    severities = severities or DEFAULT_SEVERITIES
+    generator = torch.Generator().manual_seed(seed)
+    was_training = model.training
+    model.eval()
+
+    correct = {name: torch.zeros(len(values), dtype=torch.long, device=device) for name, values in severities.items()}
+    clean_correct = torch.zeros((), dtype=torch.long, device=device)
+    num_samples = 0
+    for data, target in data_loader:
+        data, target = data.to(device), target.to(device)
+        pixels = data * MNIST_STD + MNIST_MEAN
+        num_samples += len(data)
+        with torch.no_grad():
+            clean_correct += model(data).argmax(dim=1).eq(target).sum()
+
+        for name, values in severities.items():
+            levels = torch.tensor(values, dtype=torch.float32, device=device)
+            perturbed = _PERTURBATIONS[name](model, pixels, target, levels, generator=generator, pgd_steps=pgd_steps)
+            # (S, N, 1, H, W) -> one forward pass over all severities
+            with torch.no_grad():
+                output = model(_normalize(perturbed.flatten(0, 1)))
+            hits = output.argmax(dim=1).eq(target.repeat(len(values)))
+            correct[name] += hits.view(len(values), -1).sum(dim=1)
+
+    model.train(was_training)
+    results = {"clean": [(0, clean_correct.item() / num_samples)]}
+    for name, values in severities.items():
+        results[name] = [(value, hits / num_samples) for value, hits in zip(values, correct[name].tolist())]
+
+    _report_results(results, logger)
+    return results
+
+
+def format_results(results):
+    """
+    Formats the results of `evaluate_robustness` as a text table.
+
+    Parameters
+    ----------
+    results: dict
+        Perturbation name to list of (severity, accuracy).
+    """
+    lines = [f"{'perturbation':<16} {'severity':>9} {'accuracy':>9}"]
+    for name, rows in results.items():
+        for severity, accuracy in rows:
+            lines.append(f"{name:<16} {severity:>9g} {_percent(accuracy):>8.2f}%")
+    return "\n".join(lines)
+
+
+##### Perturbations #####
+# each takes pixels (N, 1, H, W) in [0, 1] and severities (S,), and returns perturbed pixels (S, N, 1, H, W)
+def gaussian_noise(model, pixels, target, levels, generator, **_):
+    """Adds gaussian noise with std = severity."""
+    noise = torch.randn((len(levels),) + pixels.shape, generator=generator).to(pixels.device)
+    return (pixels.unsqueeze(0) + levels.view(-1, 1, 1, 1, 1) * noise).clamp(0, 1)
+
+
+def blur(model, pixels, target, levels, **_):
+    """Applies a gaussian blur with sigma = severity; all kernels run as one grouped convolution."""
+    radius = math.ceil(3 * levels.max().item())
+    offsets = torch.arange(-radius, radius + 1, dtype=torch.float32, device=pixels.device)
+    kernels_1d = torch.exp(-(offsets.view(1, -1) ** 2) / (2 * levels.view(-1, 1) ** 2))
+    kernels_1d = kernels_1d / kernels_1d.sum(dim=1, keepdim=True)
+    kernels = (kernels_1d.unsqueeze(2) * kernels_1d.unsqueeze(1)).unsqueeze(1)  # (S, 1, K, K)
+
+    blurred = torch_fn.conv2d(pixels.expand(-1, len(levels), -1, -1), kernels, padding=radius, groups=len(levels))
+    return blurred.transpose(0, 1).unsqueeze(2)
+
+
+def rotation(model, pixels, target, levels, generator, **_):
+    """Rotates by +/- severity degrees, the direction being drawn per sample."""
+    num_levels, num_images = len(levels), len(pixels)
+    signs = torch.randint(0, 2, (num_levels, num_images), generator=generator).to(pixels.device) * 2 - 1
+    angles = torch.deg2rad(levels.view(-1, 1) * signs).flatten()
+    cos, sin = torch.cos(angles), torch.sin(angles)
+    zeros = torch.zeros_like(cos)
+    theta = torch.stack([torch.stack([cos, -sin, zeros], dim=1), torch.stack([sin, cos, zeros], dim=1)], dim=1)
+
+    stacked = pixels.repeat(num_levels, 1, 1, 1)
+    grid = torch_fn.affine_grid(theta, stacked.shape, align_corners=False)
+    rotated = torch_fn.grid_sample(stacked, grid, padding_mode="zeros", align_corners=False)
+    return rotated.view((num_levels,) + pixels.shape)
+
+
+def occlusion(model, pixels, target, levels, generator, **_):
+    """Blanks a square of side = severity pixels at a random position of each image."""
+    num_levels, num_images = len(levels), len(pixels)
+    height, width = pixels.shape[-2:]
+    sizes = levels.view(-1, 1).expand(-1, num_images)
+    tops = (torch.rand((num_levels, num_images), generator=generator).to(pixels.device) * (height - sizes + 1)).floor()
+    lefts = (torch.rand((num_levels, num_images), generator=generator).to(pixels.device) * (width - sizes + 1)).floor()
+
+    rows = torch.arange(height, device=pixels.device).view(1, 1, -1, 1)
+    cols = torch.arange(width, device=pixels.device).view(1, 1, 1, -1)
+    tops, lefts, sizes = tops[..., None, None], lefts[..., None, None], sizes[..., None, None]
+    mask = (rows >= tops) & (rows < tops + sizes) & (cols >= lefts) & (cols < lefts + sizes)
+    return pixels.unsqueeze(0).masked_fill(mask.unsqueeze(2), 0.0)
+
+
+def fgsm(model, pixels, target, levels, **_):
+    """Fast gradient sign attack; one gradient serves every budget."""
+    gradient_sign = _input_gradient(model, pixels, target).sign()
+    return (pixels.unsqueeze(0) + levels.view(-1, 1, 1, 1, 1) * gradient_sign.unsqueeze(0)).clamp(0, 1)
+
+
+def pgd(model, pixels, target, levels, pgd_steps=10, **_):
+    """Projected gradient descent attack, all budgets attacked together as one stacked batch."""
+    num_levels = len(levels)
+    budgets = levels.repeat_interleave(len(pixels)).view(-1, 1, 1, 1)
+    step_size = 2.5 * budgets / pgd_steps
+    clean = pixels.repeat(num_levels, 1, 1, 1)
+    targets = target.repeat(num_levels)
+
+    adversarial = clean.clone()
+    for _ in range(pgd_steps):
+        adversarial = adversarial + step_size * _input_gradient(model, adversarial, targets).sign()
+        adversarial = torch.min(torch.max(adversarial, clean - budgets), clean + budgets).clamp(0, 1)
+    return adversarial.view((num_levels,) + pixels.shape)
+
+
+_PERTURBATIONS = {
+    "gaussian_noise": gaussian_noise,
+    "blur": blur,
+    "rotation": rotation,
+    "occlusion": occlusion,
+    "fgsm": fgsm,
+    "pgd": pgd,
+}
+
+
+##### Private Functions #####
+def _normalize(pixels):
+    return (pixels - MNIST_MEAN) / MNIST_STD
+
+
+def _input_gradient(model, pixels, target):
+    # gradient of the loss w.r.t. the input pixels only; the model parameters' .grad are left untouched
+    with torch.enable_grad():
+        pixels = pixels.detach().requires_grad_(True)
+        loss = torch_fn.nll_loss(model(_normalize(pixels)), target)
+        (gradient,) = torch.autograd.grad(loss, pixels)
+    return gradient
+
+
+def _percent(value):
+    return 100.0 * value
+
+
+def _report_results(results, logger):
+    text = format_results(results)
+    print(f"Robustness evaluation:\n{text}")
+    if logger is None:
+        return
+
+    for name, rows in results.items():
+        for level, (severity, accuracy) in enumerate(rows):
+            logger.report_scalar(f"robustness {name}", "accuracy", value=accuracy, iteration=level)
+            logger.report_scalar(f"robustness {name}", "severity", value=severity, iteration=level)
+    logger.report_text(f"Robustness evaluation:\n{text}")
@@ -4,31 +4,45 @@ To enable this code to run you will need to do the following:
     1. Setup your environment to connect to ClearML. Follow instructions on the ClearML website
     2. Ensure config_aip.py is properly configured
     3. Install packages as required
+
+Heavy libraries (clearml, torch, torchvision, numpy) are only imported once they are needed,
+so `--help` and `--dry-run` return without loading them.
 """
 import os
-from clearml import Task, Logger
 from pytorch.config_aip import cfg_clearml, cfg_s3
-from pytorch.run_training import run_training
 from pytorch.args_training import get_args
+from utils.utils_import import timed_import, import_training_stack, report_import_times
 
 
 def main():
     """Main function to connect to ClearML to run experiment"""
 
+    # validate arguments before paying for any heavy import
+    args = get_args()
+    if args.dry_run:
+        print(f"Dry run - arguments are valid: {vars(args)}")
+        return
+
     # setup clearml
     os.environ["AWS_ACCESS_KEY_ID"] = cfg_s3["aws_access_key_id"]
     os.environ["AWS_SECRET_ACCESS_KEY"] = cfg_s3["aws_secret_access_key"]
+    clearml = timed_import("clearml")
 
     # This task runs directly via ClearML server
-    Task.init(
+    clearml.Task.init(
         project_name=cfg_clearml["project_name"],
         task_name=cfg_clearml["task_name"],
         output_uri=cfg_clearml["output"],
     )
 
-    # train and validate
+    # parse again now that ClearML is initialised, so the arguments get connected to the task
     args = get_args()
-    run_training(Logger, args)
+
+    # train and validate
+    run_training = import_training_stack()
+    if args.report_import_times:
+        report_import_times(clearml.Logger)
+    run_training(clearml.Logger, args)
 
 
 if __name__ == "__main__":
@@ -4,31 +4,47 @@ To enable this code to run you will need to do the following:
     1. Setup your environment to connect to ClearML. Follow instructions on the ClearML website
     2. Ensure config_aip.py is properly configured
     3. Install packages as required
+
+Locally this script only imports ClearML: the task is enqueued and the process exits before the
+training stack (torch, torchvision, numpy) is imported. The training stack is loaded on the agent only.
 """
 import os
-from clearml import Task, Logger
 from pytorch.config_aip import cfg_clearml, cfg_s3
-from pytorch.run_training import run_training
 from pytorch.args_training import get_args
+from utils.utils_import import timed_import, import_training_stack, report_import_times
 
 
 def main():
     """Main function to connect to ClearML to run experiment"""
 
+    # validate arguments before paying for any heavy import
+    args = get_args()
+    if args.dry_run:
+        print(f"Dry run - arguments are valid: {vars(args)}")
+        return
+
     # setup clearml
     os.environ["AWS_ACCESS_KEY_ID"] = cfg_s3["aws_access_key_id"]
     os.environ["AWS_SECRET_ACCESS_KEY"] = cfg_s3["aws_secret_access_key"]
+    clearml = timed_import("clearml")
 
     # Enable this set of codes to run via ClearML agent with docker image
-    task = Task.init(
+    task = clearml.Task.init(
         project_name=cfg_clearml["project_name"], task_name=cfg_clearml["task_name"], output_uri=cfg_clearml["output"]
     )
-    task.set_base_docker(cfg_clearml[docker_image])
-    task.execute_remotely(queue_name=cfg_clearml[queue_name], exit_process=True)
+    task.set_base_docker(cfg_clearml["docker_image"])
+    if args.report_import_times:
+        report_import_times()
+    task.execute_remotely(queue_name=cfg_clearml["queue_name"], exit_process=True)
 
-    # train and validate
+    # from here on we are running on the agent; parse again to pick up the arguments set on the task
     args = get_args()
-    run_training(Logger, args)
+
+    # train and validate
+    run_training = import_training_stack()
+    if args.report_import_times:
+        report_import_times(clearml.Logger)
+    run_training(clearml.Logger, args)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 """This module contains the primary training / testing code for the network model."""
 # Standard library imports
+import math
 import os
+import time
 from tempfile import gettempdir
 
 # Other library imports
@@ -9,10 +11,18 @@ import torch.optim as optim
 import torch.nn.functional as torch_fn
 import numpy as np
 from pytorch.network import MNISTNet
+from pytorch.optimizers import LAMB, LARS
+from pytorch.early_stopping import StoppingController
+from pytorch.robustness import evaluate_robustness
+from pytorch.pruning import prune
+from pytorch.distillation import build_student, cache_teacher_outputs, report_latency_accuracy, train_distill
 from pytorch.data import get_dataloader
+from pytorch.args_training import get_args
 
 # Local library imports
 from utils.utils_pytorch import load_model, save_model
+from utils.utils_metrics import get_metrics_sink
+from utils.utils_cpu import apply_cpu_layout, get_worker_init_fn, plan_cpu_layout, tune_cpu_layout
 
 ##### Public Functions #####
 def run_training(logger, args):
@@ -22,43 +32,178 @@ def run_training(logger, args):
     Parameters
     ----------
     logger: Logger
-        Logger object for logging status messages.
+        ClearML Logger class, only required by the "clearml" metrics backend.
     args: object
         List of arguments required to run the training/testing process.
     """
+    metrics = get_metrics_sink(
+        args.metrics_backend,
+        logger,
+        path=args.metrics_path,
+        buffered=not args.no_metrics_buffer,
+        flush_interval=args.metrics_flush_interval,
+    )
     torch.manual_seed(args.seed)
     use_cuda = not args.no_cuda and torch.cuda.is_available()
     device = torch.device("cuda" if use_cuda else "cpu")
 
-    # get network and optimizer
-    model = MNISTNet().to(device)
-    optimizer = _get_optimizer(model, args.learn_rate, args.momentum)
+    # split cores between data loading and compute
+    pin_cpus = not args.no_cpu_pinning
+    if args.tune_cpu_layout:
+        layout = tune_cpu_layout(
+            lambda candidate: _benchmark_cpu_layout(candidate, args, device, pin_cpus),
+            pin=pin_cpus,
+            num_threads=args.num_threads,
+            num_interop_threads=args.num_interop_threads,
+        )
+    else:
+        layout = plan_cpu_layout(args.num_workers, args.num_threads, args.num_interop_threads)
+        apply_cpu_layout(layout, pin=pin_cpus)
+    print(layout)
+    metrics.report_text(str(layout))
+    worker_init_fn = get_worker_init_fn(layout, pin=pin_cpus)
 
-    # load weights, where applicable
-    if args.use_pretrained:
-        model = load_model(args.pretrained_model_name)
+    if args.distill:
+        try:
+            _run_distillation(device, layout.num_workers, worker_init_fn, args, metrics)
+        finally:
+            metrics.close()
+        return
+
+    # get network, loading weights where applicable
+    model = load_model(args.pretrained_model_name) if args.use_pretrained else MNISTNet()
+    model = model.to(device)
 
     # get data loaders
-    train_loader = get_dataloader(args.batch_size, is_train=True, to_shuffle=True)
-    test_loader = get_dataloader(args.batch_size, is_train=False, to_shuffle=True)
+    train_loader = get_dataloader(
+        args.batch_size, is_train=True, to_shuffle=True, num_workers=layout.num_workers, worker_init_fn=worker_init_fn
+    )
+    test_loader = get_dataloader(
+        args.batch_size, is_train=False, to_shuffle=True, num_workers=layout.num_workers, worker_init_fn=worker_init_fn
+    )
+
+    # get optimizer, scaling the learning rate to the effective batch size
+    effective_batch_size = args.batch_size * args.accum_steps
+    learn_rate = _scale_learn_rate(args.learn_rate, effective_batch_size, args.base_batch_size, args.lr_scaling)
+    optimizer = _get_optimizer(model, learn_rate, args.momentum, args.optimizer, args.weight_decay)
+    steps_per_epoch = math.ceil(len(train_loader) / args.accum_steps)
+    scheduler = _get_warmup_scheduler(optimizer, round(args.warmup_epochs * steps_per_epoch))
+    print(f"Effective batch size {effective_batch_size}, {args.optimizer} learning rate {learn_rate:.6f}")
+
+    # quick evaluations on a fixed test subset drive plateau detection; full evaluations confirm the target
+    controller = StoppingController(args.target_accuracy, args.patience, args.min_delta)
+    subset_loader = None
+    if args.eval_subset_size:
+        subset_loader = get_dataloader(
+            args.test_batch_size, is_train=False, to_shuffle=False, num_samples=args.eval_subset_size
+        )
+
+    def subset_eval(iteration):
+        _, accuracy = evaluate(model, device, subset_loader)
+        metrics.report_scalar("test subset", "accuracy", iteration=iteration, value=accuracy)
+        controller.update(accuracy)
+        if args.target_accuracy is not None and accuracy >= args.target_accuracy:
+            _, full_accuracy = evaluate(model, device, test_loader)
+            controller.check_target(full_accuracy)
+        return controller.should_stop
+
+    memory_tracker = None
+    if args.track_memory:
+        from utils.utils_memory import MemoryTracker  # pylint: disable=import-outside-toplevel
+
+        memory_tracker = MemoryTracker(
+            metrics,
+            interval=args.memory_interval,
+            growth_threshold_mb=args.memory_growth_threshold_mb,
+            window=args.memory_window,
+            tracemalloc_top=args.tracemalloc_top,
+        )
+        memory_tracker.start()
 
     # train and validate
     print(f"epochs {args.epochs + 1}")
-    for epoch in range(1, args.epochs + 1):
-        train(model, device, train_loader, optimizer, epoch, args.log_interval, logger)
-        # Print separating between traing and test
-        print()
-        test(model, device, test_loader, epoch, logger)
-        print()
-        if args.save_model:
-            save_model(model, os.path.join(gettempdir(), args.save_name))
-        logger.current_logger().report_text(
-            f"The default output destination for model snapshots and artifacts is: {args.save_name}"
-        )
-        print("\n")
+    best_at_last_full_eval = -1.0
+    try:
+        for epoch in range(1, args.epochs + 1):
+            stopped = train(
+                model,
+                device,
+                train_loader,
+                optimizer,
+                epoch,
+                args.log_interval,
+                metrics,
+                accum_steps=args.accum_steps,
+                scheduler=scheduler,
+                eval_fn=subset_eval if subset_loader is not None else None,
+                eval_interval=args.eval_interval,
+                memory_tracker=memory_tracker,
+            )
+            if subset_loader is not None and not stopped:
+                subset_eval((epoch + 1) * len(train_loader))
+            # Print separating between traing and test
+            print()
+            # with subset evaluations, the full test set is only evaluated when the subset shows progress
+            needs_full_eval = (
+                subset_loader is None
+                or controller.best_accuracy > best_at_last_full_eval
+                or controller.should_stop
+                or epoch == args.epochs
+            )
+            if needs_full_eval:
+                accuracy = test(model, device, test_loader, epoch, metrics)
+                best_at_last_full_eval = controller.best_accuracy
+                if subset_loader is None:
+                    controller.update(accuracy)
+                controller.check_target(accuracy)
+            else:
+                print(f"Skipping full evaluation, no improvement on the {args.eval_subset_size} samples subset")
+            print()
+            if args.save_model:
+                save_model(model, os.path.join(gettempdir(), args.save_name))
+            metrics.report_text(
+                f"The default output destination for model snapshots and artifacts is: {args.save_name}"
+            )
+            print("\n")
+            if memory_tracker is not None:
+                memory_tracker.on_epoch(epoch)
+            if controller.should_stop:
+                print(f"Stopping after epoch {epoch}: {controller.stop_reason}")
+                metrics.report_text(f"Stopped after epoch {epoch}: {controller.stop_reason}")
+                break
+
+        if controller.time_to_target is not None:
+            metrics.report_scalar("time to target", "seconds", iteration=0, value=controller.time_to_target)
+            print(f"Time to target accuracy {args.target_accuracy}: {controller.time_to_target:.1f}s")
+
+        if args.prune_conv1_channels or args.prune_conv2_channels or args.prune_fc1_units:
+            model = _prune_model(model, device, train_loader, test_loader, learn_rate, args, metrics)
+
+        if args.robustness_eval:
+            robustness_loader = get_dataloader(
+                args.test_batch_size, is_train=False, to_shuffle=False, num_samples=args.robustness_samples
+            )
+            evaluate_robustness(model, device, robustness_loader, logger=metrics, seed=args.seed)
+    finally:
+        if memory_tracker is not None:
+            memory_tracker.stop()
+        metrics.close()
 
 
-def train(model, device, train_loader, optimizer, epoch, log_interval, logger):
+def train(
+    model,
+    device,
+    train_loader,
+    optimizer,
+    epoch,
+    log_interval,
+    logger,
+    accum_steps=1,
+    scheduler=None,
+    eval_fn=None,
+    eval_interval=0,
+    memory_tracker=None,
+):
     """
     Default training function as taken from ClearML examples.
 
@@ -76,38 +221,68 @@ def train(model, device, train_loader, optimizer, epoch, log_interval, logger):
         Current epoch number.
     log_interval: int
         Determines frequency of logging messages.
-    logger: Logger
-        Logger object for logging status messages.
+    logger: MetricsSink
+        Metrics sink for reporting training metrics.
+    accum_steps: int
+        Number of batches whose gradients are accumulated before each optimizer step.
+    scheduler: object
+        Learning rate scheduler, stepped after every optimizer step (default: None).
+    eval_fn: function
+        Called with the current iteration every `eval_interval` batches, returns True to stop training.
+    eval_interval: int
+        Number of batches between two calls of `eval_fn`, 0 to disable.
+    memory_tracker: MemoryTracker
+        Optional tracker sampling memory usage every `memory_tracker.interval` batches.
+
+    Returns True if training was stopped by `eval_fn`.
     """
     print(f"epoch {epoch}")
-    save_loss = []
 
     model.train()
+    optimizer.zero_grad()
     for batch_idx, (data, target) in enumerate(train_loader):
         data, target = data.to(device), target.to(device)
-        optimizer.zero_grad()
         output = model(data)
         loss = compute_loss(output, target)
-        loss.backward()
-        save_loss.append(loss)
+        # average the gradients over the accumulated batches; the last group of the epoch may be shorter
+        group_start = batch_idx - batch_idx % accum_steps
+        (loss / min(accum_steps, len(train_loader) - group_start)).backward()
+
+        if (batch_idx + 1) % accum_steps == 0 or batch_idx + 1 == len(train_loader):
+            optimizer.step()
+            optimizer.zero_grad()
+            if scheduler is not None:
+                scheduler.step()
 
-        optimizer.step()
         if batch_idx % log_interval == 0:
-            logger.current_logger().report_scalar(
-                "train", "loss", iteration=(epoch * len(train_loader) + batch_idx), value=loss.item()
-            )
+            loss_value = loss.item()
+            iteration = epoch * len(train_loader) + batch_idx
+            logger.report_scalar("train", "loss", iteration=iteration, value=loss_value)
+            logger.report_scalar("train", "learning rate", iteration=iteration, value=optimizer.param_groups[0]["lr"])
             _print_training_step(
                 epoch,
                 batch_idx * len(data),
                 len(train_loader.dataset),
                 _calculate_percent(batch_idx / len(train_loader)),
-                loss.item(),
+                loss_value,
             )
             # Add manual scalar reporting for loss metrics
-            logger.current_logger().report_scalar(
-                title=f"Scalar example {epoch} - epoch", series="Loss", value=loss.item(), iteration=batch_idx
+            logger.report_scalar(
+                title=f"Scalar example {epoch} - epoch", series="Loss", value=loss_value, iteration=batch_idx
             )
 
+        if memory_tracker is not None:
+            memory_tracker.on_batch(epoch * len(train_loader) + batch_idx, batch_idx)
+
+        if eval_fn is not None and eval_interval and (batch_idx + 1) % eval_interval == 0:
+            model.eval()
+            stop = eval_fn(epoch * len(train_loader) + batch_idx)
+            model.train()
+            if stop:
+                return True
+
+    return False
+
 
 def test(model, device, test_loader, epoch, logger):
     """
@@ -123,8 +298,10 @@ def test(model, device, test_loader, epoch, logger):
         Testing data.
     epoch: int
         Current epoch number.
-    logger: Logger
-        Logger object for logging status messages.
+    logger: MetricsSink
+        Metrics sink for reporting test metrics.
+
+    Returns the accuracy on the test data.
     """
     save_test_loss = []
     save_correct = []
@@ -144,21 +321,51 @@ def test(model, device, test_loader, epoch, logger):
 
     test_loss /= len(test_loader.dataset)
 
-    logger.current_logger().report_scalar("test", "loss", iteration=epoch, value=test_loss)
-    logger.current_logger().report_scalar(
-        "test", "accuracy", iteration=epoch, value=(correct / len(test_loader.dataset))
-    )
+    logger.report_scalar("test", "loss", iteration=epoch, value=test_loss)
+    logger.report_scalar("test", "accuracy", iteration=epoch, value=(correct / len(test_loader.dataset)))
     _print_test_step(
         test_loss, correct, len(test_loader.dataset), _calculate_percent(correct / len(test_loader.dataset))
     )
-    logger.current_logger().report_histogram(
+    logger.report_histogram(
         title="Histogram example", series="correct", iteration=1, values=save_correct, xaxis="Test", yaxis="Correct"
     )
     # Manually report test loss and correct as a confusion matrix
     matrix = np.array([save_test_loss, save_correct])
-    logger.current_logger().report_confusion_matrix(
+    logger.report_confusion_matrix(
         title="Confusion matrix example", series="Test loss / correct", matrix=matrix, iteration=1
     )
+    return correct / len(test_loader.dataset)
+
+
+def evaluate(model, device, data_loader):
+    """
+    Computes the average loss and accuracy of the model without reporting anything.
+
+    Parameters
+    ----------
+    model: object
+        Neural network model to evaluate.
+    device: str
+        "cuda" or "cpu".
+    data_loader: object
+        Evaluation data.
+
+    Returns a tuple (average loss, accuracy).
+    """
+    was_training = model.training
+    model.eval()
+    total_loss = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
+    with torch.no_grad():
+        for data, target in data_loader:
+            data, target = data.to(device), target.to(device)
+            output = model(data)
+            total_loss += torch_fn.nll_loss(output, target, reduction="sum")
+            correct += output.argmax(dim=1).eq(target).sum()
+    model.train(was_training)
+
+    num_samples = len(data_loader.dataset)
+    return total_loss.item() / num_samples, correct.item() / num_samples
 
 
 def compute_loss(output, target):
@@ -188,5 +395,132 @@ def _print_test_step(loss, correct_samples, total_samples, percent_correct):
     print(f"Test set: Average loss: {loss:.4f}, Accuracy: {correct_samples}/{total_samples} ({percent_correct:.0f}%)")
 
 
-def _get_optimizer(model, learn_rate, momentum):
-    return optim.SGD(model.parameters(), lr=learn_rate, momentum=momentum)
+def _get_optimizer(model, learn_rate, momentum, name="sgd", weight_decay=0.0):
+    if name == "lars":
+        return LARS(model.parameters(), lr=learn_rate, momentum=momentum, weight_decay=weight_decay)
+    if name == "lamb":
+        return LAMB(model.parameters(), lr=learn_rate, weight_decay=weight_decay)
+    return optim.SGD(model.parameters(), lr=learn_rate, momentum=momentum, weight_decay=weight_decay)
+
+
+def _scale_learn_rate(learn_rate, batch_size, base_batch_size, scaling):
+    if scaling == "linear":
+        return learn_rate * batch_size / base_batch_size
+    if scaling == "sqrt":
+        return learn_rate * math.sqrt(batch_size / base_batch_size)
+    return learn_rate
+
+
+def _get_warmup_scheduler(optimizer, warmup_steps):
+    # linear warmup from 1 / warmup_steps of the learning rate up to the full (scaled) learning rate
+    if warmup_steps <= 0:
+        return None
+    return optim.lr_scheduler.LambdaLR(optimizer, lambda step: min(1.0, (step + 1) / warmup_steps))
+
+
+def _run_distillation(device, num_workers, worker_init_fn, args, metrics):
+    teacher = load_model(args.teacher_model_name).to(device)
+    student = build_student(args.student_arch).to(device)
+    train_loader = get_dataloader(
+        args.batch_size,
+        is_train=True,
+        to_shuffle=True,
+        num_workers=num_workers,
+        worker_init_fn=worker_init_fn,
+        with_indices=True,
+    )
+    test_loader = get_dataloader(
+        args.test_batch_size, is_train=False, to_shuffle=False, num_workers=num_workers, worker_init_fn=worker_init_fn
+    )
+
+    # the teacher only runs once, over the whole training set
+    teacher_outputs = cache_teacher_outputs(teacher, device, train_loader)
+    optimizer = _get_optimizer(student, args.learn_rate, args.momentum, args.optimizer, args.weight_decay)
+    for epoch in range(1, args.epochs + 1):
+        train_distill(student, device, train_loader, teacher_outputs, optimizer, epoch, args, metrics)
+        print()
+        test(student, device, test_loader, epoch, metrics)
+        print()
+        if args.save_model:
+            save_model(student, os.path.join(gettempdir(), f"student_{args.save_name}"))
+
+    report_latency_accuracy(
+        {"teacher": teacher, "student": student},
+        device,
+        lambda model: evaluate(model, device, test_loader)[1],
+        latency_budget_ms=args.latency_budget_ms,
+        logger=metrics,
+    )
+
+
+def _prune_model(model, device, train_loader, test_loader, learn_rate, args, metrics):
+    target_widths = {
+        "conv1_channels": args.prune_conv1_channels,
+        "conv2_channels": args.prune_conv2_channels,
+        "fc1_units": args.prune_fc1_units,
+    }
+    # fine-tuning epochs are numbered after the training epochs so their metrics do not overwrite them
+    epochs_done = [args.epochs]
+
+    def finetune(compact):
+        optimizer = _get_optimizer(compact, learn_rate, args.momentum, args.optimizer, args.weight_decay)
+        for _ in range(args.prune_finetune_epochs):
+            epochs_done[0] += 1
+            train(compact, device, train_loader, optimizer, epochs_done[0], args.log_interval, metrics)
+
+    model, _ = prune(
+        model,
+        device,
+        finetune,
+        lambda candidate: evaluate(candidate, device, test_loader)[1],
+        target_widths,
+        num_steps=args.prune_steps,
+        criterion=args.prune_criterion,
+        logger=metrics,
+    )
+    if args.save_model:
+        save_model(model, os.path.join(gettempdir(), f"pruned_{args.save_name}"))
+    return model
+
+
+def _benchmark_cpu_layout(layout, args, device, pin_cpus, num_steps=30, num_warmup_steps=3):
+    # times a few training steps on a throw-away model, excluding worker start-up in the warm-up steps
+    model = MNISTNet().to(device)
+    optimizer = _get_optimizer(model, args.learn_rate, args.momentum, args.optimizer, args.weight_decay)
+    loader = get_dataloader(
+        args.batch_size,
+        is_train=True,
+        to_shuffle=True,
+        num_workers=layout.num_workers,
+        worker_init_fn=get_worker_init_fn(layout, pin=pin_cpus),
+    )
+
+    model.train()
+    optimizer.zero_grad()
+    num_samples = 0
+    start = time.perf_counter()
+    for step, (data, target) in enumerate(loader):
+        if step == num_warmup_steps:
+            num_samples = 0
+            start = time.perf_counter()
+        if step == num_warmup_steps + num_steps:
+            break
+        data, target = data.to(device), target.to(device)
+        # same accumulation as `train`, so optimizer steps are as frequent as in the real run
+        (compute_loss(model(data), target) / args.accum_steps).backward()
+        if (step + 1) % args.accum_steps == 0:
+            optimizer.step()
+            optimizer.zero_grad()
+        num_samples += len(data)
+
+    return num_samples / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # offline entry point without ClearML, e.g. `python -m pytorch.run_training --metrics-backend jsonl`
+    offline_args = get_args()
+    if offline_args.metrics_backend == "clearml":
+        # there is no ClearML task to report to, keep the metrics in a local file instead
+        offline_args.metrics_backend = "jsonl"
+        print(f"No ClearML task, reporting metrics to {offline_args.metrics_path or 'metrics.jsonl'}")
+    run_training(None, offline_args)
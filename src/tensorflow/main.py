@@ -1,3 +1,7 @@
+import argparse
+import os
+import time
+
 import tensorflow.compat.v2 as tf
 import tensorflow_datasets as tfds
 from PIL import Image
@@ -6,30 +10,84 @@ import numpy as np
 tf.enable_v2_behavior()
 
 from clearml import Task
-task = Task.init(project_name='mnist_demo', task_name='mnist1')
 
 
-def get_model():
+def get_args():
+    parser = argparse.ArgumentParser(description='TensorFlow MNIST Example')
+    parser.add_argument('--epochs', type=int, default=2, help='number of epochs to train (default: 2)')
+    parser.add_argument('--batch-size', type=int, default=128, help='input batch size (default: 128)')
+    parser.add_argument('--shuffle-buffer', type=int, default=10000,
+                        help='shuffle buffer size, the full 60k split is not needed to decorrelate batches '
+                             '(default: 10000)')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='cache the decoded datasets to files in this directory, reused across runs '
+                             '(default: cache in memory)')
+    parser.add_argument('--deterministic', action='store_true', default=False,
+                        help='keep a deterministic element order (default: allow reordering for speed)')
+    parser.add_argument('--jit-compile', action='store_true', default=False, help='compile the model with XLA')
+    parser.add_argument('--mixed-bf16', action='store_true', default=False,
+                        help='use the mixed_bfloat16 precision policy')
+    parser.add_argument('--steps-per-execution', type=int, default=1,
+                        help='training steps run per tf.function call (default: 1)')
+    parser.add_argument('--benchmark-input', action='store_true', default=False,
+                        help='only time one pass over the input pipeline, without training')
+    parser.add_argument('--save-path', type=str, default='model.savedmodel', help='SavedModel output path')
+    return parser.parse_args()
+
+
+def get_model(jit_compile=False, steps_per_execution=1):
     model = tf.keras.models.Sequential([
         tf.keras.layers.Flatten(input_shape=(28, 28, 1)),
         tf.keras.layers.Dense(128, activation='relu'),
-        tf.keras.layers.Dense(10)
+        # logits are kept in float32 so the loss is numerically stable under mixed precision
+        tf.keras.layers.Dense(10, dtype='float32')
     ])
     model.compile(
         optimizer=tf.keras.optimizers.Adam(0.001),
         loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
         metrics=[tf.keras.metrics.SparseCategoricalAccuracy()],
+        jit_compile=jit_compile,
+        steps_per_execution=steps_per_execution,
     )
 
     model.summary()
     return model
 
 
-def train(model, epochs, ds_train, ds_test):
-    model.fit(ds_train, epochs=epochs, validation_data=ds_test)
+def train(model, epochs, ds_train, ds_test, callbacks=None):
+    model.fit(ds_train, epochs=epochs, validation_data=ds_test, callbacks=callbacks)
     return model
 
 
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Reports the training throughput (samples/s) of every epoch."""
+
+    def __init__(self, batch_size, logger=None):
+        super().__init__()
+        self.batch_size = batch_size
+        self.logger = logger
+        self._epoch_start = None
+        self._train_end = None
+        self._num_batches = 0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._num_batches = 0
+        self._epoch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        # with steps_per_execution > 1 keras reports the last batch of each execution
+        self._num_batches = batch + 1
+        self._train_end = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        # validation runs before on_epoch_end: time the training batches only
+        seconds = self._train_end - self._epoch_start
+        throughput = self._num_batches * self.batch_size / seconds
+        print(f'Epoch {epoch + 1}: {throughput:.0f} samples/s ({seconds:.1f}s)')
+        if self.logger is not None:
+            self.logger.report_scalar('throughput', 'samples/s', value=throughput, iteration=epoch + 1)
+
+
 def infer(model, x):
     return model.predict(x)
 
@@ -68,22 +126,57 @@ def normalize_img(image, label):
     return tf.cast(image, tf.float32) / 255., label
 
 
-if __name__ == '__main__':
-    ds_train, ds_test, ds_info = get_data()
+def build_pipeline(ds, batch_size, is_train, cache_dir=None, shuffle_buffer=10000, deterministic=False):
+    """
+    Builds the input pipeline of one split.
+
+    The compact uint8 images are cached (to a file when `cache_dir` is given, so later runs skip decoding),
+    then shuffled and batched; normalisation is applied once per batch rather than once per image.
+    """
+    options = tf.data.Options()
+    options.experimental_deterministic = deterministic
+    ds = ds.with_options(options)
 
-    ds_train = ds_train.map(normalize_img, num_parallel_calls=tf.data.experimental.AUTOTUNE)
-    ds_train = ds_train.cache()
-    ds_train = ds_train.shuffle(ds_info.splits['train'].num_examples)
-    ds_train = ds_train.batch(128)
-    ds_train = ds_train.prefetch(tf.data.experimental.AUTOTUNE)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        ds = ds.cache(os.path.join(cache_dir, 'train' if is_train else 'test'))
+    else:
+        ds = ds.cache()
+    if is_train:
+        ds = ds.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size, drop_remainder=is_train)
+    ds = ds.map(normalize_img, num_parallel_calls=tf.data.experimental.AUTOTUNE, deterministic=deterministic)
+    return ds.prefetch(tf.data.experimental.AUTOTUNE)
 
-    ds_test = ds_test.map(normalize_img, num_parallel_calls=tf.data.experimental.AUTOTUNE)
-    ds_test = ds_test.batch(128)
-    ds_test = ds_test.cache()
-    ds_test = ds_test.prefetch(tf.data.experimental.AUTOTUNE)
 
-    model = get_model()
-    model = train(model, 2, ds_train, ds_test)
-    save(model, "model.savedmodel")
+def benchmark_dataset(ds, batch_size):
+    start = time.perf_counter()
+    num_batches = 0
+    for _ in ds:
+        num_batches += 1
+    seconds = time.perf_counter() - start
+    print(f'Input pipeline: {num_batches * batch_size / seconds:.0f} samples/s ({seconds:.1f}s)')
 
-    print("Model saved...!!!")
+
+if __name__ == '__main__':
+    task = Task.init(project_name='mnist_demo', task_name='mnist1')
+    args = get_args()
+
+    if args.mixed_bf16:
+        tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+
+    ds_train, ds_test, ds_info = get_data()
+    ds_train = build_pipeline(ds_train, args.batch_size, True, args.cache_dir, args.shuffle_buffer, args.deterministic)
+    ds_test = build_pipeline(ds_test, args.batch_size, False, args.cache_dir, deterministic=args.deterministic)
+
+    if args.benchmark_input:
+        # the first pass fills the cache, the second one measures the steady state
+        benchmark_dataset(ds_train, args.batch_size)
+        benchmark_dataset(ds_train, args.batch_size)
+    else:
+        model = get_model(args.jit_compile, args.steps_per_execution)
+        model = train(model, args.epochs, ds_train, ds_test,
+                      callbacks=[ThroughputCallback(args.batch_size, task.get_logger())])
+        save(model, args.save_path)
+
+        print("Model saved...!!!")
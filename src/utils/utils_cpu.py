@@ -0,0 +1,211 @@
+"""
+This module contains utility codes for partitioning CPU cores between data loading workers and compute threads.
+
+On shared agents, DataLoader workers and torch intra-op threads default to "as many as there are CPUs" each and
+end up oversubscribing the cores. The layout computed here gives the loader workers and the compute threads
+disjoint sets of physical cores, sizes the thread pools to match, and optionally pins each side to its cores.
+"""
+# Standard library imports
+import functools
+import os
+import time
+
+# Other library imports
+import torch
+
+_INTEROP_THREADS_SET = False
+
+
+class CpuLayout:
+    """
+    Partition of the available CPUs between DataLoader workers and compute threads.
+
+    Attributes
+    ----------
+    num_workers: int
+        Number of DataLoader worker processes.
+    num_threads: int
+        Number of torch intra-op compute threads.
+    num_interop_threads: int
+        Number of torch inter-op threads.
+    loader_cpus: list
+        Logical CPUs the DataLoader workers are pinned to.
+    compute_cpus: list
+        Logical CPUs the main (compute) process is pinned to.
+    """
+
+    def __init__(self, num_workers, num_threads, num_interop_threads, loader_cpus, compute_cpus):
+        self.num_workers = num_workers
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+        self.loader_cpus = loader_cpus
+        self.compute_cpus = compute_cpus
+
+    def __str__(self):
+        return (
+            f"CPU layout: {self.num_workers} loader workers on cpus {_format_cpus(self.loader_cpus)}, "
+            f"{self.num_threads} compute threads / {self.num_interop_threads} interop threads "
+            f"on cpus {_format_cpus(self.compute_cpus)}"
+        )
+
+
+def get_physical_cores():
+    """
+    Groups the logical CPUs available to this process by physical core.
+
+    Returns a list of lists, one list of logical CPU ids (SMT siblings) per physical core.
+    Falls back to one group per logical CPU when the topology cannot be read (e.g. non-Linux systems).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+
+    cores = {}
+    for cpu in cpus:
+        cores.setdefault(_read_core_key(cpu), []).append(cpu)
+    return sorted(cores.values())
+
+
+def plan_cpu_layout(num_workers=None, num_threads=None, num_interop_threads=None, cores=None):
+    """
+    Computes a topology-aware CPU layout. Any value given explicitly overrides the automatic choice.
+
+    By default one physical core in four (none on machines with two cores or fewer) is given to the loader
+    workers, and one compute thread is used per remaining physical core so SMT siblings do not compete.
+
+    Parameters
+    ----------
+    num_workers: int
+        Number of DataLoader workers (default: automatic).
+    num_threads: int
+        Number of intra-op compute threads (default: automatic).
+    num_interop_threads: int
+        Number of inter-op threads (default: 1, MNISTNet has no parallel branches).
+    cores: list
+        Physical cores to partition, as returned by `get_physical_cores` (default: the cores available now).
+    """
+    if cores is None:
+        cores = get_physical_cores()
+    if num_workers is None:
+        num_workers = 0 if len(cores) <= 2 else max(1, len(cores) // 4)
+
+    # loader workers get whole physical cores; if they would take everything, both sides share all cores
+    num_loader_cores = min(num_workers, len(cores) - 1)
+    if num_workers > 0 and num_loader_cores > 0:
+        loader_cpus = [cpu for core in cores[:num_loader_cores] for cpu in core]
+        compute_cores = cores[num_loader_cores:]
+    else:
+        loader_cpus = [cpu for core in cores for cpu in core] if num_workers > 0 else []
+        compute_cores = cores
+
+    if num_threads is None:
+        num_threads = len(compute_cores)
+    compute_cpus = [cpu for core in compute_cores for cpu in core]
+
+    return CpuLayout(num_workers, num_threads, num_interop_threads or 1, loader_cpus, compute_cpus)
+
+
+def apply_cpu_layout(layout, pin=True):
+    """
+    Applies the thread counts of a layout and, optionally, pins the current process to its compute CPUs.
+
+    Parameters
+    ----------
+    layout: CpuLayout
+        Layout to apply.
+    pin: bool
+        Pins the current process to `layout.compute_cpus`.
+    """
+    global _INTEROP_THREADS_SET  # pylint: disable=global-statement
+
+    # exported for libraries / subprocesses that read them at start-up
+    os.environ["OMP_NUM_THREADS"] = str(layout.num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(layout.num_threads)
+    torch.set_num_threads(layout.num_threads)
+
+    # torch only allows the inter-op pool to be sized once, before any inter-op work has started
+    if not _INTEROP_THREADS_SET:
+        try:
+            torch.set_num_interop_threads(layout.num_interop_threads)
+        except RuntimeError as e:
+            print(f"CPU - could not set inter-op threads: {e}")
+        _INTEROP_THREADS_SET = True
+
+    if pin and layout.compute_cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, layout.compute_cpus)
+
+
+def get_worker_init_fn(layout, pin=True):
+    """
+    Returns a DataLoader `worker_init_fn` restricting each worker to one thread and, optionally, to the loader CPUs.
+
+    Parameters
+    ----------
+    layout: CpuLayout
+        Layout providing the loader CPUs.
+    pin: bool
+        Pins the workers to `layout.loader_cpus`.
+    """
+    return functools.partial(_init_worker, layout.loader_cpus if pin else [])
+
+
+def tune_cpu_layout(benchmark_fn, pin=True, num_threads=None, num_interop_threads=None):
+    """
+    Searches the loader / compute split giving the best throughput on this machine.
+
+    Every candidate split of the physical cores is applied and timed with `benchmark_fn`,
+    and the fastest layout is applied before returning.
+
+    Parameters
+    ----------
+    benchmark_fn: function
+        Called with a CpuLayout once it is applied, returns the measured throughput (higher is better).
+    pin: bool
+        Pins the processes while benchmarking and for the selected layout.
+    num_threads: int
+        Number of intra-op compute threads, fixed for all candidates (default: one per compute core).
+    num_interop_threads: int
+        Number of inter-op threads, fixed for all candidates.
+    """
+    # read once: applying a candidate narrows the process affinity the next one would be planned from
+    cores = get_physical_cores()
+    num_cores = len(cores)
+    candidates = sorted({0, 1, 2, num_cores // 4, num_cores // 2})
+    candidates = [num_workers for num_workers in candidates if num_workers < max(num_cores, 2)]
+
+    results = []
+    for num_workers in candidates:
+        layout = plan_cpu_layout(num_workers, num_threads, num_interop_threads, cores=cores)
+        apply_cpu_layout(layout, pin=pin)
+        start = time.perf_counter()
+        throughput = benchmark_fn(layout)
+        print(f"{layout} -> {throughput:.1f} samples/s ({time.perf_counter() - start:.1f}s)")
+        results.append((throughput, layout))
+
+    best = max(results, key=lambda result: result[0])[1]
+    apply_cpu_layout(best, pin=pin)
+    return best
+
+
+##### Private Functions #####
+def _read_core_key(cpu):
+    topology_dir = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+    try:
+        with open(os.path.join(topology_dir, "physical_package_id"), encoding="utf-8") as package_file:
+            package_id = int(package_file.read())
+        with open(os.path.join(topology_dir, "core_id"), encoding="utf-8") as core_file:
+            core_id = int(core_file.read())
+    except (OSError, ValueError):
+        return (0, cpu)
+    return (package_id, core_id)
+
+
+def _init_worker(loader_cpus, _worker_id):
+    torch.set_num_threads(1)
+    if loader_cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, loader_cpus)
+
+
+def _format_cpus(cpus):
+    return ",".join(str(cpu) for cpu in cpus) if cpus else "-"
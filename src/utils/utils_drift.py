@@ -0,0 +1,327 @@
+"""
+This module contains streaming drift detection over inference traffic.
+
+A reference profile (pixel-intensity histogram, per-class prediction rates and a prediction-confidence sketch)
+is computed in one pass over the training split. The DriftMonitor then keeps the same fixed-memory statistics
+over windows of live traffic, updated with vectorized per-batch operations, and emits PSI / KS drift scores
+for each completed window. Only NumPy is required, so the monitor can run inline with the NumPy or torch scorer.
+"""
+# Other library imports
+import numpy as np
+
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+
+# range of the normalised pixels produced by the training data loader
+PIXEL_RANGE = ((0.0 - MNIST_MEAN) / MNIST_STD, (1.0 - MNIST_MEAN) / MNIST_STD)
+
+DEFAULT_THRESHOLDS = {"pixel_psi": 0.1, "class_psi": 0.2, "confidence_psi": 0.2, "confidence_ks": 0.1}
+
+
+class StreamingHistogram:
+    """
+    Fixed-bin histogram updated incrementally with batches of values.
+
+    Also used as a quantile sketch: quantiles are interpolated from the cumulative counts,
+    with an error bounded by the bin width.
+
+    Attributes
+    ----------
+    low: float
+        Lower edge of the first bin; smaller values are counted in the first bin.
+    high: float
+        Upper edge of the last bin; larger values are counted in the last bin.
+    counts: np.ndarray
+        Number of values per bin.
+    """
+
+    def __init__(self, num_bins, low, high):
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(num_bins, dtype=np.int64)
+        self._scale = num_bins / (high - low)
+
+    @property
+    def total(self):
+        """Number of values counted."""
+        return int(self.counts.sum())
+
+    def update(self, values):
+        """
+        Counts a batch of values.
+
+        Parameters
+        ----------
+        values: np.ndarray
+            Values of any shape.
+        """
+        values = np.asarray(values, dtype=np.float32).ravel()
+        bins = ((values - self.low) * self._scale).astype(np.int64)
+        np.clip(bins, 0, len(self.counts) - 1, out=bins)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def distribution(self):
+        """Returns the fraction of values per bin."""
+        return self.counts / max(self.total, 1)
+
+    def quantile(self, q):
+        """
+        Returns the approximate q-quantile of the values counted.
+
+        Parameters
+        ----------
+        q: float
+            Quantile between 0 and 1.
+        """
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] == 0:
+            return float("nan")
+        index = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        index = min(index, len(self.counts) - 1)
+        # interpolate within the bin holding the quantile
+        previous = cumulative[index - 1] if index > 0 else 0
+        fraction = (q * cumulative[-1] - previous) / max(self.counts[index], 1)
+        return float(self.low + (index + min(max(fraction, 0.0), 1.0)) / self._scale)
+
+    def reset(self):
+        """Clears all counts."""
+        self.counts[:] = 0
+
+
+class DriftProfile:
+    """
+    Statistics describing one population of inputs and predictions.
+
+    Attributes
+    ----------
+    pixels: StreamingHistogram
+        Histogram of the (normalised) pixel intensities.
+    classes: np.ndarray
+        Number of predictions per class.
+    confidence: StreamingHistogram
+        Histogram of the top-class probability, used as a quantile sketch.
+    """
+
+    def __init__(self, num_classes=10, pixel_bins=32, confidence_bins=200, pixel_range=PIXEL_RANGE):
+        self.pixels = StreamingHistogram(pixel_bins, *pixel_range)
+        self.classes = np.zeros(num_classes, dtype=np.int64)
+        self.confidence = StreamingHistogram(confidence_bins, 0.0, 1.0)
+        self.num_samples = 0
+
+    def update(self, inputs, probs=None):
+        """
+        Adds a batch of samples to the statistics.
+
+        Parameters
+        ----------
+        inputs: np.ndarray
+            Normalised images, first dimension is the batch.
+        probs: np.ndarray
+            Predicted class probabilities of shape (N, num_classes) (default: None, inputs only).
+        """
+        inputs = np.asarray(inputs)
+        self.pixels.update(inputs)
+        self.num_samples += len(inputs)
+        if probs is not None:
+            probs = np.asarray(probs)
+            self.classes += np.bincount(probs.argmax(axis=1), minlength=len(self.classes))
+            self.confidence.update(probs.max(axis=1))
+
+    def reset(self):
+        """Clears all statistics."""
+        self.pixels.reset()
+        self.classes[:] = 0
+        self.confidence.reset()
+        self.num_samples = 0
+
+    def save(self, path):
+        """
+        Saves the profile to a .npz file.
+
+        Parameters
+        ----------
+        path: str
+            Output file path.
+        """
+        np.savez(
+            path,
+            pixels=self.pixels.counts,
+            pixel_range=np.array([self.pixels.low, self.pixels.high]),
+            classes=self.classes,
+            confidence=self.confidence.counts,
+            num_samples=np.array(self.num_samples),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a profile saved with `save`.
+
+        Parameters
+        ----------
+        path: str
+            Path of the .npz file.
+        """
+        with np.load(path) as data:
+            profile = cls(
+                num_classes=len(data["classes"]),
+                pixel_bins=len(data["pixels"]),
+                confidence_bins=len(data["confidence"]),
+                pixel_range=tuple(data["pixel_range"]),
+            )
+            profile.pixels.counts[:] = data["pixels"]
+            profile.classes[:] = data["classes"]
+            profile.confidence.counts[:] = data["confidence"]
+            profile.num_samples = int(data["num_samples"])
+        return profile
+
+
+class DriftMonitor:
+    """
+    Compares windows of inference traffic against a reference profile.
+
+    Attributes
+    ----------
+    reference: DriftProfile
+        Profile of the training data.
+    window_size: int
+        Number of samples per window.
+    thresholds: dict
+        Score thresholds above which a window is flagged as drifted.
+    logger: MetricsSink
+        Optional sink the scores of every window are reported to.
+
+    Methods
+    -------
+    update(inputs=np.ndarray, probs=np.ndarray)
+        Adds a batch of traffic, returns the scores of the windows completed by it.
+    """
+
+    def __init__(self, reference, window_size=1000, thresholds=None, logger=None):
+        self.reference = reference
+        self.window_size = window_size
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.logger = logger
+        self.num_windows = 0
+        self._window = DriftProfile(
+            num_classes=len(reference.classes),
+            pixel_bins=len(reference.pixels.counts),
+            confidence_bins=len(reference.confidence.counts),
+            pixel_range=(reference.pixels.low, reference.pixels.high),
+        )
+
+    def update(self, inputs, probs=None):
+        """
+        Adds a batch of traffic to the current window.
+
+        Parameters
+        ----------
+        inputs: np.ndarray
+            Normalised images, first dimension is the batch.
+        probs: np.ndarray
+            Predicted class probabilities of shape (N, num_classes) (default: None, inputs only).
+
+        Returns the list of scores of the windows completed by this batch.
+        """
+        inputs = np.asarray(inputs)
+        probs = None if probs is None else np.asarray(probs)
+        results = []
+        start = 0
+        while start < len(inputs):
+            # split the batch at window boundaries
+            end = min(len(inputs), start + self.window_size - self._window.num_samples)
+            self._window.update(inputs[start:end], None if probs is None else probs[start:end])
+            start = end
+            if self._window.num_samples >= self.window_size:
+                results.append(self._close_window())
+        return results
+
+    def scores(self):
+        """Returns the drift scores of the current (possibly incomplete) window."""
+        window, reference = self._window, self.reference
+        scores = {
+            "pixel_psi": population_stability_index(reference.pixels.distribution(), window.pixels.distribution()),
+            "pixel_ks": ks_statistic(reference.pixels.counts, window.pixels.counts),
+        }
+        if window.classes.sum() > 0:
+            scores["class_psi"] = population_stability_index(
+                _normalise(reference.classes), _normalise(window.classes)
+            )
+            scores["confidence_psi"] = population_stability_index(
+                reference.confidence.distribution(), window.confidence.distribution()
+            )
+            scores["confidence_ks"] = ks_statistic(reference.confidence.counts, window.confidence.counts)
+            scores["confidence_p10"] = window.confidence.quantile(0.1)
+            scores["confidence_p50"] = window.confidence.quantile(0.5)
+        scores["drift"] = any(scores.get(name, 0.0) > value for name, value in self.thresholds.items())
+        return scores
+
+    def _close_window(self):
+        scores = self.scores()
+        self.num_windows += 1
+        if self.logger is not None:
+            for name, value in scores.items():
+                self.logger.report_scalar("drift", name, value=float(value), iteration=self.num_windows)
+        self._window.reset()
+        return scores
+
+
+def build_reference_profile(data_loader, predict_fn=None, **profile_kwargs):
+    """
+    Computes the reference profile in one pass over a data loader, e.g.
+    `get_dataloader(1000, is_train=True, to_shuffle=False)`.
+
+    Parameters
+    ----------
+    data_loader: iterable
+        Yields (images, labels) batches; torch tensors and NumPy arrays are both accepted.
+    predict_fn: function
+        Maps a batch of images (np.ndarray) to class probabilities (default: None, inputs only).
+        For example `lambda x: np.exp(load_numpy_model(path)(x))`.
+    profile_kwargs: dict
+        Passed to DriftProfile (number of classes / bins, pixel range).
+    """
+    profile = DriftProfile(**profile_kwargs)
+    for data, _ in data_loader:
+        data = np.asarray(data)
+        profile.update(data, None if predict_fn is None else predict_fn(data))
+    return profile
+
+
+def population_stability_index(expected, actual, eps=1e-4):
+    """
+    Returns the PSI between two discrete distributions.
+
+    Parameters
+    ----------
+    expected: np.ndarray
+        Reference fractions per bin.
+    actual: np.ndarray
+        Observed fractions per bin.
+    eps: float
+        Floor applied to empty bins.
+    """
+    expected = np.maximum(expected, eps)
+    actual = np.maximum(actual, eps)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected_counts, actual_counts):
+    """
+    Returns the Kolmogorov-Smirnov statistic between two histograms sharing the same bins.
+
+    Parameters
+    ----------
+    expected_counts: np.ndarray
+        Reference counts per bin.
+    actual_counts: np.ndarray
+        Observed counts per bin.
+    """
+    expected_cdf = np.cumsum(expected_counts) / max(np.sum(expected_counts), 1)
+    actual_cdf = np.cumsum(actual_counts) / max(np.sum(actual_counts), 1)
+    return float(np.max(np.abs(expected_cdf - actual_cdf)))
+
+
+##### Private Functions #####
+def _normalise(counts):
+    return counts / max(counts.sum(), 1)
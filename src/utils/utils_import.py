@@ -0,0 +1,61 @@
+"""This module contains utility codes for deferring and timing heavy imports."""
+import importlib
+import time
+
+_IMPORT_TIMES = {}
+
+
+def timed_import(module_name):
+    """
+    Imports a module and records the wall time spent importing it.
+
+    Modules already present in sys.modules are returned as-is and are recorded as (almost) zero cost,
+    so the breakdown only reflects what each entry point actually paid for.
+
+    Parameters
+    ----------
+    module_name: str
+        Fully qualified name of the module to import.
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _IMPORT_TIMES[module_name] = _IMPORT_TIMES.get(module_name, 0.0) + time.perf_counter() - start
+    return module
+
+
+def get_import_times():
+    """Returns a copy of the recorded import times in seconds, keyed by module name."""
+    return dict(_IMPORT_TIMES)
+
+
+def import_training_stack():
+    """
+    Imports the PyTorch training stack and returns the `run_training` function.
+
+    Libraries are imported one by one so the import-time breakdown attributes the cost to each of them.
+    """
+    for module_name in ("numpy", "torch", "torchvision"):
+        timed_import(module_name)
+    return timed_import("pytorch.run_training").run_training
+
+
+def report_import_times(logger=None):
+    """
+    Prints the import-time breakdown, slowest first.
+
+    Parameters
+    ----------
+    logger: Logger
+        Optional ClearML Logger class. When given, the breakdown is also reported as text.
+    """
+    lines = [f"{name:<32} {seconds * 1000:9.1f} ms" for name, seconds in _sorted_times()]
+    lines.append(f"{'total':<32} {sum(_IMPORT_TIMES.values()) * 1000:9.1f} ms")
+    text = "Import time breakdown:\n" + "\n".join(lines)
+    print(text)
+    if logger is not None:
+        logger.current_logger().report_text(text)
+
+
+##### Private Functions #####
+def _sorted_times():
+    return sorted(_IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,207 @@
+"""
+This module contains utility codes for tracking the memory footprint of a training run.
+
+The process RSS, the torch CUDA allocator statistics and the number of Python objects tracked by the garbage
+collector are sampled at epoch (and optionally batch interval) boundaries and reported as scalars. A steady
+increase of the RSS over several samples is flagged as a probable leak, with the allocation sites that grew the
+most according to tracemalloc when it is enabled.
+"""
+# Standard library imports
+import gc
+import os
+import sys
+import tracemalloc
+from collections import deque
+
+# Other library imports
+import torch
+
+_MB = 1024 * 1024
+
+
+class MemoryTracker:
+    """
+    Samples memory usage during training and flags monotonic RSS growth.
+
+    Attributes
+    ----------
+    logger: MetricsSink
+        Optional sink the samples are reported to.
+    interval: int
+        Number of batches between two batch samples, 0 to sample at epoch boundaries only.
+    growth_threshold_mb: float
+        RSS growth (MB) over `window` consecutive increasing samples that is reported as a probable leak.
+    window: int
+        Number of consecutive samples the growth is checked over.
+    tracemalloc_top: int
+        Number of top allocation sites listed with each leak warning, 0 to disable tracemalloc.
+    warnings: list
+        Leak warnings raised so far.
+
+    Methods
+    -------
+    start()
+        Starts tracemalloc (if enabled) and takes the baseline sample.
+    on_batch(iteration=int, batch_idx=int)
+        Samples every `interval` batches.
+    on_epoch(epoch=int)
+        Samples at the end of an epoch.
+    sample(kind=str, iteration=int)
+        Takes, reports and checks one sample.
+    top_allocations(limit=int)
+        Returns the allocation sites that grew the most since `start`.
+    stop()
+        Stops tracemalloc.
+    """
+
+    def __init__(self, logger=None, interval=0, growth_threshold_mb=50.0, window=3, tracemalloc_top=0):
+        self.logger = logger
+        self.interval = interval
+        self.growth_threshold_mb = growth_threshold_mb
+        self.window = window
+        self.tracemalloc_top = tracemalloc_top
+        self.warnings = []
+
+        # batch and epoch samples are checked separately, their spacing differs
+        self._history = {"batch": deque(maxlen=window + 1), "epoch": deque(maxlen=window + 1)}
+        self._baseline = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        """Starts tracemalloc (if enabled) and takes the baseline sample."""
+        if self.tracemalloc_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if tracemalloc.is_tracing():
+            self._baseline = tracemalloc.take_snapshot()
+        return self.sample("epoch", 0)
+
+    def on_batch(self, iteration, batch_idx):
+        """
+        Samples every `interval` batches.
+
+        Parameters
+        ----------
+        iteration: int
+            Global training iteration, used as the reporting iteration.
+        batch_idx: int
+            Batch index within the epoch.
+        """
+        if self.interval and batch_idx % self.interval == 0:
+            self.sample("batch", iteration)
+
+    def on_epoch(self, epoch):
+        """
+        Samples at the end of an epoch.
+
+        Parameters
+        ----------
+        epoch: int
+            Epoch that just ended.
+        """
+        return self.sample("epoch", epoch)
+
+    def sample(self, kind, iteration):
+        """
+        Takes one sample, reports it and checks the RSS history of its kind for monotonic growth.
+
+        Parameters
+        ----------
+        kind: str
+            "epoch" or "batch".
+        iteration: int
+            Reporting iteration.
+
+        Returns a dict with the "rss_mb", "python_objects" and, on CUDA, "cuda_allocated_mb" / "cuda_reserved_mb".
+        """
+        stats = get_memory_stats()
+        if self.logger is not None:
+            for name, value in stats.items():
+                self.logger.report_scalar(f"memory ({kind})", name, value=value, iteration=iteration)
+
+        history = self._history[kind]
+        history.append(stats["rss_mb"])
+        self._check_growth(kind, iteration, history)
+        return stats
+
+    def top_allocations(self, limit=10):
+        """
+        Returns the allocation sites that grew the most since `start`, one formatted line each.
+
+        Parameters
+        ----------
+        limit: int
+            Number of allocation sites (default: 10).
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        if self._baseline is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self._baseline, "lineno")
+        return [str(stat) for stat in stats[:limit]]
+
+    def stop(self):
+        """Stops tracemalloc if it was started by this tracker."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._baseline = None
+
+    def _check_growth(self, kind, iteration, history):
+        if len(history) <= self.window:
+            return
+        samples = list(history)
+        growth = samples[-1] - samples[0]
+        is_monotonic = all(later > earlier for earlier, later in zip(samples, samples[1:]))
+        if not is_monotonic or growth < self.growth_threshold_mb:
+            return
+
+        message = (
+            f"Memory - RSS grew by {growth:.1f} MB over the last {self.window} {kind} samples "
+            f"(now {samples[-1]:.1f} MB at {kind} iteration {iteration}), possible leak"
+        )
+        if self.tracemalloc_top:
+            message += "\nTop allocation sites since start:\n" + "\n".join(self.top_allocations(self.tracemalloc_top))
+        self.warnings.append(message)
+        print(message)
+        if self.logger is not None:
+            self.logger.report_text(message)
+        # only warn again after a new full window of growth
+        history.clear()
+        history.append(samples[-1])
+
+
+def get_rss_mb():
+    """
+    Returns the resident set size of the current process in MB.
+
+    Reads /proc/self/statm on Linux and falls back to the peak RSS reported by `resource` on other Unix systems.
+    Returns NaN where neither is available (Windows).
+    """
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        # Unix-only module, imported here so the tracker can still be imported on Windows
+        try:
+            import resource  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return float("nan")
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes on Linux
+        return max_rss / _MB if sys.platform == "darwin" else max_rss / 1024
+
+
+def get_memory_stats():
+    """
+    Returns the current memory statistics: "rss_mb", "python_objects" (objects tracked by the garbage collector)
+    and, when CUDA is initialised, "cuda_allocated_mb" and "cuda_reserved_mb" of the torch allocator.
+    """
+    stats = {"rss_mb": get_rss_mb(), "python_objects": len(gc.get_objects())}
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        stats["cuda_allocated_mb"] = torch.cuda.memory_allocated() / _MB
+        stats["cuda_reserved_mb"] = torch.cuda.memory_reserved() / _MB
+    return stats
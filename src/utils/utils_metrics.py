@@ -0,0 +1,317 @@
+"""
+This module contains pluggable metrics sinks used by the training / testing code.
+
+Every sink exposes the subset of the ClearML Logger API used in this repo (`report_scalar`, `report_text`,
+`report_histogram`, `report_confusion_matrix`), so the training code does not need to know whether metrics
+go to a live ClearML task, to local files, or nowhere at all.
+"""
+# Standard library imports
+import csv
+import json
+import os
+import threading
+import time
+
+METRICS_BACKENDS = ("clearml", "jsonl", "csv", "noop")
+
+
+class MetricsSink:
+    """
+    Base class of all metrics sinks. All reporting methods are no-ops.
+
+    Methods
+    -------
+    report_scalar(title=str, series=str, value=float, iteration=int)
+        Reports a single scalar value.
+    report_text(msg=str)
+        Reports a free text message.
+    report_histogram(title=str, series=str, values=list, iteration=int, xaxis=str, yaxis=str)
+        Reports a histogram.
+    report_confusion_matrix(title=str, series=str, matrix=object, iteration=int)
+        Reports a 2D matrix.
+    flush()
+        Forces buffered metrics to be written.
+    close()
+        Flushes and releases any resource held by the sink.
+    """
+
+    def report_scalar(self, title, series, value, iteration):
+        """Reports a single scalar value."""
+
+    def report_text(self, msg):
+        """Reports a free text message."""
+
+    def report_histogram(self, title, series, values, iteration, xaxis=None, yaxis=None):
+        """Reports a histogram."""
+
+    def report_confusion_matrix(self, title, series, matrix, iteration):
+        """Reports a 2D matrix."""
+
+    def flush(self):
+        """Forces buffered metrics to be written."""
+
+    def close(self):
+        """Flushes and releases any resource held by the sink."""
+        self.flush()
+
+
+class NoOpSink(MetricsSink):
+    """Sink discarding every metric. Useful for benchmarking the training loop itself."""
+
+
+class ClearMLSink(MetricsSink):
+    """
+    Sink forwarding every metric to the current ClearML task logger.
+
+    Attributes
+    ----------
+    logger: Logger
+        ClearML Logger class (or instance) providing `current_logger()`.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def report_scalar(self, title, series, value, iteration):
+        self.logger.current_logger().report_scalar(
+            title=title, series=series, value=_to_float(value), iteration=iteration
+        )
+
+    def report_text(self, msg):
+        self.logger.current_logger().report_text(msg)
+
+    def report_histogram(self, title, series, values, iteration, xaxis=None, yaxis=None):
+        self.logger.current_logger().report_histogram(
+            title=title, series=series, values=values, iteration=iteration, xaxis=xaxis, yaxis=yaxis
+        )
+
+    def report_confusion_matrix(self, title, series, matrix, iteration):
+        self.logger.current_logger().report_confusion_matrix(
+            title=title, series=series, matrix=matrix, iteration=iteration
+        )
+
+
+class JsonlSink(MetricsSink):
+    """
+    Sink appending one JSON record per metric to a local file.
+
+    Attributes
+    ----------
+    path: str
+        Output file path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        _make_parent_dir(path)
+        self._file = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def report_scalar(self, title, series, value, iteration):
+        self._write(kind="scalar", title=title, series=series, iteration=iteration, value=_to_float(value))
+
+    def report_text(self, msg):
+        self._write(kind="text", value=msg)
+
+    def report_histogram(self, title, series, values, iteration, xaxis=None, yaxis=None):
+        self._write(
+            kind="histogram",
+            title=title,
+            series=series,
+            iteration=iteration,
+            value=_to_list(values),
+            xaxis=xaxis,
+            yaxis=yaxis,
+        )
+
+    def report_confusion_matrix(self, title, series, matrix, iteration):
+        self._write(kind="matrix", title=title, series=series, iteration=iteration, value=_to_list(matrix))
+
+    def flush(self):
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def _write(self, **record):
+        record["time"] = time.time()
+        self._file.write(json.dumps(record) + "\n")
+
+
+class CsvSink(MetricsSink):
+    """
+    Sink appending one CSV row per metric to a local file.
+    Non-scalar values (text, histograms, matrices) are JSON encoded in the `value` column.
+
+    Attributes
+    ----------
+    path: str
+        Output file path.
+    """
+
+    FIELDS = ("time", "kind", "title", "series", "iteration", "value")
+
+    def __init__(self, path):
+        self.path = path
+        _make_parent_dir(path)
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")  # pylint: disable=consider-using-with
+        self._writer = csv.DictWriter(self._file, fieldnames=self.FIELDS)
+        if write_header:
+            self._writer.writeheader()
+
+    def report_scalar(self, title, series, value, iteration):
+        self._write("scalar", title, series, iteration, _to_float(value))
+
+    def report_text(self, msg):
+        self._write("text", None, None, None, json.dumps(msg))
+
+    def report_histogram(self, title, series, values, iteration, xaxis=None, yaxis=None):
+        self._write("histogram", title, series, iteration, json.dumps(_to_list(values)))
+
+    def report_confusion_matrix(self, title, series, matrix, iteration):
+        self._write("matrix", title, series, iteration, json.dumps(_to_list(matrix)))
+
+    def flush(self):
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def _write(self, kind, title, series, iteration, value):
+        self._writer.writerow(dict(zip(self.FIELDS, (time.time(), kind, title, series, iteration, value))))
+
+
+class BufferedSink(MetricsSink):
+    """
+    Sink buffering metrics in memory and forwarding them to another sink in batches on a background thread,
+    so reporting a metric never blocks the training step on I/O or network calls.
+
+    Scalars reported more than once for the same (title, series, iteration) between two flushes are aggregated,
+    keeping only the latest value. Values may be passed as 0-dim tensors: they are converted to float on the
+    background thread rather than in the training loop.
+
+    Attributes
+    ----------
+    sink: MetricsSink
+        Sink receiving the buffered metrics.
+    flush_interval: float
+        Seconds between two background flushes.
+    max_pending: int
+        Number of pending metrics triggering an early flush.
+    """
+
+    def __init__(self, sink, flush_interval=1.0, max_pending=1000):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._scalars = {}
+        self._events = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def report_scalar(self, title, series, value, iteration):
+        with self._lock:
+            self._scalars[(title, series, iteration)] = value
+            pending = len(self._scalars) + len(self._events)
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def report_text(self, msg):
+        self._add_event("report_text", msg)
+
+    def report_histogram(self, title, series, values, iteration, xaxis=None, yaxis=None):
+        self._add_event("report_histogram", title, series, values, iteration, xaxis, yaxis)
+
+    def report_confusion_matrix(self, title, series, matrix, iteration):
+        self._add_event("report_confusion_matrix", title, series, matrix, iteration)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                scalars, self._scalars = self._scalars, {}
+                events, self._events = self._events, []
+            for (title, series, iteration), value in scalars.items():
+                self.sink.report_scalar(title, series, _to_float(value), iteration)
+            for method_name, args in events:
+                getattr(self.sink, method_name)(*args)
+            self.sink.flush()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self.sink.close()
+
+    def _add_event(self, method_name, *args):
+        with self._lock:
+            self._events.append((method_name, args))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:  # pylint: disable=broad-except
+                # a failing backend must never take the training process down
+                print(f"Metrics - flush failed: {e}")
+
+
+def get_metrics_sink(backend, logger=None, path=None, buffered=True, flush_interval=1.0):
+    """
+    Creates the metrics sink for the given backend.
+
+    Parameters
+    ----------
+    backend: str
+        One of "clearml", "jsonl", "csv" or "noop".
+    logger: Logger
+        ClearML Logger class, required by the "clearml" backend.
+    path: str
+        Output file path for the "jsonl" and "csv" backends (default: metrics.<backend> in the working directory).
+    buffered: bool
+        Wraps the sink in a BufferedSink flushing on a background thread.
+    flush_interval: float
+        Seconds between two background flushes when buffered.
+    """
+    if backend == "clearml":
+        if logger is None:
+            raise ValueError("The clearml metrics backend requires a ClearML Logger")
+        sink = ClearMLSink(logger)
+    elif backend == "jsonl":
+        sink = JsonlSink(path or "metrics.jsonl")
+    elif backend == "csv":
+        sink = CsvSink(path or "metrics.csv")
+    elif backend == "noop":
+        return NoOpSink()
+    else:
+        raise ValueError(f"Unknown metrics backend {backend}, expected one of {METRICS_BACKENDS}")
+
+    if buffered:
+        sink = BufferedSink(sink, flush_interval=flush_interval)
+    return sink
+
+
+##### Private Functions #####
+def _to_float(value):
+    return float(value.item()) if hasattr(value, "item") else float(value)
+
+
+def _to_list(values):
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _make_parent_dir(path):
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
@@ -0,0 +1,262 @@
+"""
+This module contains a torch-free NumPy inference engine for MNISTNet checkpoints.
+
+Checkpoints saved by `utils_pytorch.save_model` are read directly from the torch zip format, and the
+conv / pool / linear / log-softmax forward pass is computed with batched im2col + GEMM in NumPy. Importing this
+module only pulls in NumPy and the standard library, so scorers start in milliseconds instead of seconds.
+"""
+# Standard library imports
+import collections
+import pickle
+import zipfile
+
+# Other library imports
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+
+_STORAGE_DTYPES = {
+    "DoubleStorage": np.float64,
+    "FloatStorage": np.float32,
+    "HalfStorage": np.float16,
+    "LongStorage": np.int64,
+    "IntStorage": np.int32,
+    "ShortStorage": np.int16,
+    "CharStorage": np.int8,
+    "ByteStorage": np.uint8,
+    "BoolStorage": np.bool_,
+}
+
+
+class NumpyMNISTNet:
+    """
+    NumPy implementation of the MNISTNet forward pass.
+
+    Layer widths are read from the weights, so compact (pruned) MNISTNet variants are supported as well.
+    Activations are kept channels-last (NHWC) so every convolution is a single contiguous GEMM.
+
+    Attributes
+    ----------
+    batch_size: int
+        Maximum number of images per forward chunk, bounds the memory used by im2col.
+
+    Methods
+    -------
+    forward(x=np.ndarray)
+        Returns the log-probabilities of a batch of normalised images.
+    predict(x=np.ndarray)
+        Returns the predicted class of a batch of normalised images.
+    """
+
+    def __init__(self, state_dict, batch_size=256):
+        """
+        Parameters
+        ----------
+        state_dict: dict
+            MNISTNet weights as NumPy arrays, e.g. from `load_state_dict`.
+        batch_size: int
+            Maximum number of images per forward chunk (default: 256).
+        """
+        self.batch_size = batch_size
+        params = {name: np.asarray(value, dtype=np.float32) for name, value in state_dict.items()}
+
+        self._conv1_kernel = params["conv1.weight"].shape[-1]
+        self._conv2_kernel = params["conv2.weight"].shape[-1]
+        # (out, in, k, k) -> (in * k * k, out), matching the (in, k, k) order of the im2col windows
+        self._conv1_weight = _to_gemm_weight(params["conv1.weight"])
+        self._conv1_bias = params["conv1.bias"]
+        self._conv2_weight = _to_gemm_weight(params["conv2.weight"])
+        self._conv2_bias = params["conv2.bias"]
+
+        # fc1 expects features flattened channels-first; reorder its columns once for channels-last activations
+        fc1_weight = params["fc1.weight"]
+        num_channels = params["conv2.weight"].shape[0]
+        side = int(round((fc1_weight.shape[1] // num_channels) ** 0.5))
+        fc1_weight = fc1_weight.reshape(-1, num_channels, side, side).transpose(0, 2, 3, 1)
+        self._fc1_weight = np.ascontiguousarray(fc1_weight.reshape(fc1_weight.shape[0], -1).T)
+        self._fc1_bias = params["fc1.bias"]
+        self._fc2_weight = np.ascontiguousarray(params["fc2.weight"].T)
+        self._fc2_bias = params["fc2.bias"]
+
+    def __call__(self, x):
+        return self.forward(x)
+
+    def forward(self, x):
+        """
+        Returns the log-probabilities of a batch of normalised images.
+
+        Parameters
+        ----------
+        x: np.ndarray
+            Images of shape (N, 1, 28, 28), (N, 28, 28, 1) or (N, 28, 28), normalised as for training.
+        """
+        x = _to_nhwc(np.asarray(x, dtype=np.float32))
+        chunks = [self._forward(x[start : start + self.batch_size]) for start in range(0, len(x), self.batch_size)]
+        return np.concatenate(chunks) if chunks else np.empty((0, self._fc2_bias.shape[0]), dtype=np.float32)
+
+    def predict(self, x):
+        """
+        Returns the predicted class of a batch of normalised images.
+
+        Parameters
+        ----------
+        x: np.ndarray
+            Images of shape (N, 1, 28, 28), (N, 28, 28, 1) or (N, 28, 28), normalised as for training.
+        """
+        return self.forward(x).argmax(axis=1)
+
+    def _forward(self, x):
+        x = _max_pool2d(_relu(_conv2d(x, self._conv1_weight, self._conv1_bias, self._conv1_kernel)))
+        x = _max_pool2d(_relu(_conv2d(x, self._conv2_weight, self._conv2_bias, self._conv2_kernel)))
+        x = x.reshape(len(x), -1)
+        x = _relu(x @ self._fc1_weight + self._fc1_bias)
+        x = x @ self._fc2_weight + self._fc2_bias
+        return _log_softmax(x)
+
+
+def load_state_dict(model_name):
+    """
+    Reads a state dict saved with `torch.save` (zip format, torch >= 1.6) into NumPy arrays without importing torch.
+
+    Parameters
+    ----------
+    model_name: str
+        Path of the checkpoint.
+    """
+    if not zipfile.is_zipfile(model_name):
+        raise ValueError(f"{model_name} is not a zip-format torch checkpoint, re-save it with torch >= 1.6")
+
+    with zipfile.ZipFile(model_name) as archive:
+        pickle_name = next(name for name in archive.namelist() if name.endswith("data.pkl"))
+        prefix = pickle_name[: -len("data.pkl")]
+        byteorder = "little"
+        if f"{prefix}byteorder" in archive.namelist():
+            byteorder = archive.read(f"{prefix}byteorder").decode()
+        with archive.open(pickle_name) as pickle_file:
+            state_dict = _CheckpointUnpickler(pickle_file, archive, prefix, byteorder).load()
+
+    return collections.OrderedDict((name, value) for name, value in state_dict.items())
+
+
+def load_numpy_model(model_name, batch_size=256):
+    """
+    Loads an MNISTNet checkpoint into a NumpyMNISTNet.
+
+    Parameters
+    ----------
+    model_name: str
+        Path of the checkpoint saved by `utils_pytorch.save_model`.
+    batch_size: int
+        Maximum number of images per forward chunk (default: 256).
+    """
+    return NumpyMNISTNet(load_state_dict(model_name), batch_size=batch_size)
+
+
+def preprocess(images):
+    """
+    Normalises raw uint8 images (0-255) the same way as the training data loader.
+
+    Parameters
+    ----------
+    images: np.ndarray
+        Images of shape (N, 28, 28) or (N, 1, 28, 28).
+    """
+    return (np.asarray(images, dtype=np.float32) / 255.0 - MNIST_MEAN) / MNIST_STD
+
+
+def compare_with_torch(model_name, num_samples=64, seed=0):
+    """
+    Returns the maximum absolute difference between the NumPy and torch log-probabilities on random inputs.
+    Imports torch, for validation only.
+
+    Parameters
+    ----------
+    model_name: str
+        Path of the checkpoint.
+    num_samples: int
+        Number of random images compared (default: 64).
+    seed: int
+        Seed of the random images (default: 0).
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+    from utils.utils_pytorch import load_model  # pylint: disable=import-outside-toplevel
+
+    images = preprocess(np.random.default_rng(seed).integers(0, 256, size=(num_samples, 1, 28, 28)))
+    torch_model = load_model(model_name).eval()
+    with torch.no_grad():
+        expected = torch_model(torch.from_numpy(images)).numpy()
+    return float(np.abs(load_numpy_model(model_name)(images) - expected).max())
+
+
+##### Private Classes / Functions #####
+class _CheckpointUnpickler(pickle.Unpickler):
+    # only the globals found in a plain state dict are resolved; anything else is refused rather than executed
+
+    def __init__(self, file, archive, prefix, byteorder):
+        super().__init__(file)
+        self._archive = archive
+        self._prefix = prefix
+        self._byteorder = "<" if byteorder == "little" else ">"
+
+    def find_class(self, module, name):
+        if module == "collections" and name == "OrderedDict":
+            return collections.OrderedDict
+        if module == "torch._utils" and name == "_rebuild_tensor_v2":
+            return _rebuild_tensor
+        if module == "torch._utils" and name == "_rebuild_parameter":
+            return _rebuild_parameter
+        if module == "torch" and name in _STORAGE_DTYPES:
+            return np.dtype(_STORAGE_DTYPES[name])
+        raise pickle.UnpicklingError(f"Unsupported object {module}.{name} in checkpoint")
+
+    def persistent_load(self, pid):
+        # pid = ("storage", dtype, key, location, numel)
+        _, dtype, key, _, _ = pid
+        data = self._archive.read(f"{self._prefix}data/{key}")
+        return np.frombuffer(data, dtype=dtype.newbyteorder(self._byteorder))
+
+
+def _rebuild_tensor(storage, storage_offset, size, stride, *_):
+    strides = tuple(step * storage.itemsize for step in stride)
+    array = np.lib.stride_tricks.as_strided(storage[storage_offset:], shape=tuple(size), strides=strides)
+    return array.astype(array.dtype.newbyteorder("="), copy=True)
+
+
+def _rebuild_parameter(data, *_):
+    return data
+
+
+def _to_gemm_weight(weight):
+    return np.ascontiguousarray(weight.reshape(weight.shape[0], -1).T)
+
+
+def _to_nhwc(x):
+    if x.ndim == 3:
+        return x[..., np.newaxis]
+    if x.ndim == 4 and x.shape[1] == 1 and x.shape[-1] != 1:
+        return x.transpose(0, 2, 3, 1)
+    return x
+
+
+def _conv2d(x, weight, bias, kernel_size):
+    # im2col: (N, H, W, C) -> (N * OH * OW, C * K * K), then one GEMM with the (C * K * K, OUT) weights
+    windows = sliding_window_view(x, (kernel_size, kernel_size), axis=(1, 2))
+    num_images, out_height, out_width = windows.shape[:3]
+    cols = windows.reshape(num_images * out_height * out_width, -1)
+    return (cols @ weight + bias).reshape(num_images, out_height, out_width, -1)
+
+
+def _max_pool2d(x):
+    num_images, height, width, channels = x.shape
+    return x.reshape(num_images, height // 2, 2, width // 2, 2, channels).max(axis=(2, 4))
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _log_softmax(x):
+    shifted = x - x.max(axis=1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=1, keepdims=True))
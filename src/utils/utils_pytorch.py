@@ -1,26 +1,31 @@
 """This module contains utility codes for loading/saving pytorch models."""
+import time
+
 import torch
 
-from pytorch.network import MNISTNet
+from pytorch.network import build_model
 
 
 def load_model(model_name):
     """
-    Loads model weights from the given model name into the default MNISTNet model.
+    Loads model weights from the given model name into the matching network (MNISTNet by default).
+    The architecture and layer widths are read from the weights, so compact (pruned) models and distilled
+    students are rebuilt as they were saved.
 
     Parameters
     ----------
     model_name: str
         Model name to load the weights.
     """
-    model = MNISTNet()
-    model_dict = model.state_dict()
     pretrained_dict = torch.load(model_name)
 
     if 0 == len(pretrained_dict):
         print(f"Could not load model from {model_name}")
         return
 
+    model = build_model(pretrained_dict)
+    model_dict = model.state_dict()
+
     model_dict.update(pretrained_dict)
     model.load_state_dict(model_dict)
     return model
@@ -37,3 +42,57 @@ def save_model(model, model_name):
         Model save name.
     """
     torch.save(model.state_dict(), model_name)
+
+
+def get_model_size(model):
+    """
+    Returns the number of parameters and their size in bytes.
+
+    Parameters
+    ----------
+    model: object
+        Model to measure.
+    """
+    num_params = sum(param.numel() for param in model.parameters())
+    num_bytes = sum(param.numel() * param.element_size() for param in model.parameters())
+    return num_params, num_bytes
+
+
+def measure_latency(model, device, batch_size=1, num_iterations=200, num_warmup=20):
+    """
+    Measures the forward latency of the model on random MNIST-sized inputs.
+
+    Parameters
+    ----------
+    model: object
+        Model to measure.
+    device: str
+        "cuda" or "cpu".
+    batch_size: int
+        Number of images per forward pass (default: 1).
+    num_iterations: int
+        Number of timed forward passes (default: 200).
+    num_warmup: int
+        Number of untimed forward passes run first (default: 20).
+
+    Returns a dict with the p50 and p99 latencies in milliseconds.
+    """
+    was_training = model.training
+    model.eval()
+    data = torch.randn(batch_size, 1, 28, 28, device=device)
+    timings = []
+    with torch.no_grad():
+        for iteration in range(num_warmup + num_iterations):
+            start = time.perf_counter()
+            model(data)
+            if data.is_cuda:
+                torch.cuda.synchronize()
+            if iteration >= num_warmup:
+                timings.append(time.perf_counter() - start)
+    model.train(was_training)
+
+    timings.sort()
+    return {
+        "p50_ms": 1000 * timings[len(timings) // 2],
+        "p99_ms": 1000 * timings[min(len(timings) - 1, int(0.99 * len(timings)))],
+    }
@@ -8,8 +8,10 @@ Adapted from https://github.com/cshikai/onboarding_demo/blob/main/model/src/aipl
 # Standard imports
 import os
 import sys
+import json
 import zipfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from typing import Union
 from pathlib import Path
@@ -17,6 +19,7 @@ from pathlib import Path
 # 3rd party imports
 import boto3
 import requests
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 
 
@@ -30,6 +33,12 @@ class S3Utils:
         No. attempts to connect to S3
     WAIT_TIME: int
         Seconds to wait per connection attempt
+    MULTIPART_THRESHOLD: int
+        Object size (bytes) from which copies are split into concurrent multipart (UploadPartCopy) requests
+    MULTIPART_CHUNKSIZE: int
+        Size (bytes) of each part of a multipart copy
+    MAX_CONCURRENCY: int
+        Max. concurrent requests per multipart copy, and concurrent objects per folder copy
     cert_output_dir: str
         cert output directory
     cert_download_url: str
@@ -67,10 +76,23 @@ class S3Utils:
         Upload a single file to S3
     upload_folder(local_dir: str, s3_prefix: str, bucket: str, verbose: str)
         Uploads all files from a local directory to S3 Storage with the inserted prefix.
+    copy_file(src_key: str, dst_key: str, src_bucket: str, dst_bucket: str, verbose: int)
+        Server-side copy of a single file, without downloading it.
+    move_file(src_key: str, dst_key: str, src_bucket: str, dst_bucket: str, verbose: int)
+        Server-side move of a single file (copy then delete the source).
+    copy_folder(src_prefix: str, dst_prefix: str, src_bucket: str, dst_bucket: str, verbose: int)
+        Concurrent server-side copy of all files with the prefix.
+    move_folder(src_prefix: str, dst_prefix: str, src_bucket: str, dst_bucket: str, verbose: int)
+        Concurrent server-side move of all files with the prefix.
+    promote_model(src_prefix: str, dst_prefix: str, manifest_key: str, src_bucket: str, dst_bucket: str, ...)
+        Copies a model folder server-side, then writes a manifest pointing to it.
     """
 
     MAX_ATTEMPT = 5
     WAIT_TIME = 1
+    MULTIPART_THRESHOLD = 64 * 1024 * 1024
+    MULTIPART_CHUNKSIZE = 64 * 1024 * 1024
+    MAX_CONCURRENCY = 10
 
     def __init__(
         self,
@@ -422,3 +444,290 @@ class S3Utils:
             print(f"S3 - All files have been successfully uploaded to s3://{bucket}/{s3_prefix}")
 
         return
+
+    def copy_file(
+        self,
+        src_key: str,
+        dst_key: str,
+        src_bucket: str = None,
+        dst_bucket: str = None,
+        verbose: int = 1,
+    ) -> bool:
+
+        """
+        Server-side copy of a single file: the data never transits through the client.
+        Files larger than MULTIPART_THRESHOLD are copied as concurrent multipart (UploadPartCopy) requests.
+
+        Parameters
+        ----------
+        src_key : str
+            Key of the file to copy
+        dst_key : str
+            Key of the copy
+        src_bucket : str
+            Manually state another bucket to copy from, otherwise copy from main bucket (default = None)
+        dst_bucket : str
+            Manually state another bucket to copy to, otherwise copy to main bucket (default = None)
+        verbose : int
+            Decide whether to print logs [0: Print exceptions, 1: Print all] (default = 1)
+        """
+
+        src_bucket = src_bucket or self.bucket
+        dst_bucket = dst_bucket or self.bucket
+
+        if verbose == 1:
+            print(f"S3 - Copying s3://{src_bucket}/{src_key} to s3://{dst_bucket}/{dst_key}")
+
+        transfer_config = TransferConfig(
+            multipart_threshold=self.MULTIPART_THRESHOLD,
+            multipart_chunksize=self.MULTIPART_CHUNKSIZE,
+            max_concurrency=self.MAX_CONCURRENCY,
+        )
+        return self._with_retry(
+            lambda: self.s3.meta.client.copy(
+                {"Bucket": src_bucket, "Key": src_key}, dst_bucket, dst_key, Config=transfer_config
+            )
+        )
+
+    def move_file(
+        self,
+        src_key: str,
+        dst_key: str,
+        src_bucket: str = None,
+        dst_bucket: str = None,
+        verbose: int = 1,
+    ) -> bool:
+
+        """
+        Server-side move of a single file: copies it, then deletes the source once the copy succeeded.
+
+        Parameters
+        ----------
+        src_key : str
+            Key of the file to move
+        dst_key : str
+            Key of the moved file
+        src_bucket : str
+            Manually state another bucket to move from, otherwise move from main bucket (default = None)
+        dst_bucket : str
+            Manually state another bucket to move to, otherwise move to main bucket (default = None)
+        verbose : int
+            Decide whether to print logs [0: Print exceptions, 1: Print all] (default = 1)
+        """
+
+        src_bucket = src_bucket or self.bucket
+        if not self.copy_file(src_key, dst_key, src_bucket, dst_bucket, verbose):
+            return False
+        return self._with_retry(lambda: self.s3.meta.client.delete_object(Bucket=src_bucket, Key=src_key))
+
+    def copy_folder(
+        self,
+        src_prefix: str,
+        dst_prefix: str,
+        src_bucket: str = None,
+        dst_bucket: str = None,
+        verbose: int = 1,
+    ) -> list:
+
+        """
+        Server-side copy of all files with the prefix, MAX_CONCURRENCY files at a time.
+
+        Parameters
+        ----------
+        src_prefix : str
+            Folder of the files to copy, matched as a whole path segment ("models/v1" excludes "models/v10")
+        dst_prefix : str
+            Prefix replacing src_prefix in the keys of the copies
+        src_bucket : str
+            Manually state another bucket to copy from, otherwise copy from main bucket (default = None)
+        dst_bucket : str
+            Manually state another bucket to copy to, otherwise copy to main bucket (default = None)
+        verbose : int
+            Decide whether to print logs [
+                0: Only print exceptions,
+                1: Only print main method logs,
+                2: Print all
+            ] (default = 1)
+
+        Returns the list of (src_key, dst_key) copied.
+        """
+
+        src_bucket = src_bucket or self.bucket
+        dst_bucket = dst_bucket or self.bucket
+
+        if verbose > 0:
+            print(f"S3 - Copying files with the prefix: {src_prefix} from {src_bucket} to {dst_bucket}/{dst_prefix}")
+
+        # list the folder only: "models/v1" must not match "models/v10/..."
+        folder_prefix = src_prefix.rstrip("/") + "/" if src_prefix.rstrip("/") else ""
+        keys = [
+            (obj.key, self._replace_prefix(obj.key, folder_prefix, dst_prefix))
+            for obj in self.s3.Bucket(src_bucket).objects.filter(Prefix=folder_prefix)
+            # skip directories
+            if obj.key[-1] != "/"
+        ]
+        sub_verbose = 0 if verbose <= 1 else 1
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENCY) as executor:
+            results = list(
+                executor.map(
+                    lambda key_pair: self.copy_file(*key_pair, src_bucket, dst_bucket, sub_verbose),
+                    keys,
+                )
+            )
+
+        failed = [src_key for (src_key, _), success in zip(keys, results) if not success]
+        if failed:
+            raise RuntimeError(f"S3 - Could not copy {len(failed)} files, e.g. {failed[0]}")
+
+        if verbose > 0:
+            print(f"S3 - {len(keys)} files successfully copied to s3://{dst_bucket}/{dst_prefix}")
+
+        return keys
+
+    def move_folder(
+        self,
+        src_prefix: str,
+        dst_prefix: str,
+        src_bucket: str = None,
+        dst_bucket: str = None,
+        verbose: int = 1,
+    ) -> list:
+
+        """
+        Server-side move of all files with the prefix: all files are copied first, and the sources are only
+        deleted (in batches of up to 1000 keys) once every copy succeeded.
+
+        Parameters
+        ----------
+        src_prefix : str
+            Folder of the files to move, matched as a whole path segment ("models/v1" excludes "models/v10")
+        dst_prefix : str
+            Prefix replacing src_prefix in the keys of the moved files
+        src_bucket : str
+            Manually state another bucket to move from, otherwise move from main bucket (default = None)
+        dst_bucket : str
+            Manually state another bucket to move to, otherwise move to main bucket (default = None)
+        verbose : int
+            Decide whether to print logs [
+                0: Only print exceptions,
+                1: Only print main method logs,
+                2: Print all
+            ] (default = 1)
+
+        Returns the list of (src_key, dst_key) moved.
+        """
+
+        src_bucket = src_bucket or self.bucket
+        keys = self.copy_folder(src_prefix, dst_prefix, src_bucket, dst_bucket, verbose)
+
+        src_keys = [src_key for src_key, _ in keys]
+        errors = []
+        for start in range(0, len(src_keys), 1000):
+            batch = {"Objects": [{"Key": key} for key in src_keys[start : start + 1000]], "Quiet": True}
+            responses = []
+            if not self._with_retry(
+                lambda batch=batch, responses=responses: responses.append(
+                    self.s3.meta.client.delete_objects(Bucket=src_bucket, Delete=batch)
+                )
+            ):
+                raise RuntimeError(f"S3 - Could not delete the moved files from s3://{src_bucket}/{src_prefix}")
+            # per-key failures are reported in the response, not raised
+            errors += responses[-1].get("Errors", [])
+        if errors:
+            raise RuntimeError(
+                f"S3 - Could not delete {len(errors)} moved source files, e.g. {errors[0].get('Key')}: "
+                f"{errors[0].get('Code')} {errors[0].get('Message')}"
+            )
+
+        if verbose > 0:
+            print(f"S3 - {len(src_keys)} source files deleted from s3://{src_bucket}/{src_prefix}")
+
+        return keys
+
+    def promote_model(
+        self,
+        src_prefix: str,
+        dst_prefix: str,
+        manifest_key: str,
+        src_bucket: str = None,
+        dst_bucket: str = None,
+        metadata: dict = None,
+        verbose: int = 1,
+    ) -> dict:
+
+        """
+        Promotes a model folder, e.g. from the training artifacts to the model bucket, without downloading it.
+        The files are copied server-side first and the manifest is written last, in a single PUT: readers that
+        resolve the model through the manifest see either the previous release or the complete new one.
+
+        Parameters
+        ----------
+        src_prefix : str
+            Prefix of the model files to promote
+        dst_prefix : str
+            Prefix of the promoted model files (e.g. "mnist/v3")
+        manifest_key : str
+            Key of the manifest pointing to the promoted model (e.g. "mnist/latest.json"), in the destination bucket
+        src_bucket : str
+            Manually state another bucket to promote from, otherwise promote from main bucket (default = None)
+        dst_bucket : str
+            Manually state another bucket to promote to, otherwise promote to main bucket (default = None)
+        metadata : dict
+            Extra fields stored in the manifest, e.g. metrics or the training task id (default = None)
+        verbose : int
+            Decide whether to print logs [0: Only print exceptions, 1: Only print main method logs, 2: Print all]
+
+        Returns the manifest written.
+        """
+
+        src_bucket = src_bucket or self.bucket
+        dst_bucket = dst_bucket or self.bucket
+
+        keys = self.copy_folder(src_prefix, dst_prefix, src_bucket, dst_bucket, verbose)
+        if not keys:
+            raise RuntimeError(f"S3 - No files to promote under s3://{src_bucket}/{src_prefix}, manifest not written")
+        manifest = {
+            "bucket": dst_bucket,
+            "prefix": dst_prefix,
+            "files": [dst_key for _, dst_key in keys],
+            "source": f"s3://{src_bucket}/{src_prefix}",
+            "promoted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "metadata": metadata or {},
+        }
+        body = json.dumps(manifest, indent=2).encode("utf-8")
+        if not self._with_retry(
+            lambda: self.s3.meta.client.put_object(
+                Bucket=dst_bucket, Key=manifest_key, Body=body, ContentType="application/json"
+            )
+        ):
+            raise RuntimeError(f"S3 - Could not write the manifest s3://{dst_bucket}/{manifest_key}")
+
+        if verbose > 0:
+            print(f"S3 - Model promoted to s3://{dst_bucket}/{dst_prefix}, manifest s3://{dst_bucket}/{manifest_key}")
+
+        return manifest
+
+    @staticmethod
+    def _replace_prefix(key, src_prefix, dst_prefix):
+        relative = key[len(src_prefix) :].lstrip("/")
+        dst_prefix = dst_prefix.rstrip("/")
+        if not relative:
+            return dst_prefix
+        # an empty destination prefix is the bucket root: no leading slash
+        return dst_prefix + "/" + relative if dst_prefix else relative
+
+    def _with_retry(self, action):
+        attempt_no = 1
+        while attempt_no <= self.MAX_ATTEMPT:
+            try:
+                action()
+                return True
+            except ConnectionError as e:
+                if attempt_no == self.MAX_ATTEMPT:
+                    print("S3 - Max attempts reached. Connection to S3 not successful. Error is shown below.")
+                    print(e)
+                else:
+                    print("S3 - connection failed. Retrying...")
+                    time.sleep(self.WAIT_TIME)
+                attempt_no += 1
+        return False